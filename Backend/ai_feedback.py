@@ -1,6 +1,9 @@
 
 from groq import Groq
 import os
+import re
+import hashlib
+import diskcache
 from dotenv import load_dotenv
 
 
@@ -14,9 +17,46 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 # -------------------------
 client = Groq(api_key=GROQ_API_KEY)
 
+# -------------------------
+# LLM Response Cache
+# -------------------------
+# Keyed on the full prompt, so any change in JD, resume chunks, scores
+# or violations produces a new key; identical re-analyses skip Groq.
+LLM_MODEL = "llama-3.3-70b-versatile"
+LLM_CACHE_TTL = 86400 * 7
+_LLM_CACHE = diskcache.Cache(os.getenv("LLM_CACHE_DIR", "./.llm_cache"), size_limit=1 << 30)
+
+# Section headings the rule-based check expects to see in a resume; a plain
+# substring match, so "Experiences" or "Educational Background" count too
+_SECTIONS_RE = re.compile(r"(experience|education)", re.IGNORECASE)
+REQUIRED_SECTIONS = frozenset({"experience", "education"})
+
 # -------------------------
 # Strict Field Validation (ALWAYS RUN)
 # -------------------------
+_MSG_DEGREE_MISSING = "❌ MISSING: JD requires '{jd}' degree, but no degree found in resume."
+_MSG_DEGREE_MISMATCH = "⚠️ MISMATCH: JD expects '{jd}', but resume shows '{resume}'."
+_MSG_BRANCH_MISSING = "❌ MISSING: JD requires '{jd}' branch, but no branch/stream found in resume."
+_MSG_BRANCH_MISMATCH = "⚠️ MISMATCH: JD expects '{jd}', but resume shows '{resume}'."
+_MSG_CGPA_MISSING = "❌ MISSING: JD requires CGPA {jd}+, but no CGPA mentioned in resume."
+_MSG_CGPA_BELOW = "❌ BELOW CUTOFF: JD requires {jd}, but resume shows {resume}. This may disqualify you."
+_MSG_CGPA_PASS = "✅ CGPA requirement met: {resume} >= {jd}"
+_MSG_EXPERIENCE_MISSING = "❌ MISSING: JD requires {jd}+ years of experience, but no experience info found."
+_MSG_EXPERIENCE_BELOW = "❌ INSUFFICIENT: JD requires {jd} years, but resume shows only {resume} years."
+_MSG_EXPERIENCE_PASS = "✅ Experience requirement met: {resume} >= {jd} years"
+
+# (field key, label, missing template, mismatch template)
+_TEXT_REQUIREMENTS = (
+    ("degree", "Degree", _MSG_DEGREE_MISSING, _MSG_DEGREE_MISMATCH),
+    ("branch", "Branch/Stream", _MSG_BRANCH_MISSING, _MSG_BRANCH_MISMATCH),
+)
+
+# (field key, label, missing template, below-cutoff template, pass template)
+_NUMERIC_REQUIREMENTS = (
+    ("cgpa", "CGPA/GPA", _MSG_CGPA_MISSING, _MSG_CGPA_BELOW, _MSG_CGPA_PASS),
+    ("experience", "Experience", _MSG_EXPERIENCE_MISSING, _MSG_EXPERIENCE_BELOW, _MSG_EXPERIENCE_PASS),
+)
+
 def validate_strict_requirements(resume_text, analysis_results):
     """
     Check hard requirements: CGPA, Degree, Branch, Experience
@@ -28,89 +68,34 @@ def validate_strict_requirements(resume_text, analysis_results):
     violations = []
     warnings = []
     
-    # 1. Degree Check
-    if jd_fields.get("degree"):
-        resume_degree = resume_fields.get("degree")
-        jd_degree = jd_fields["degree"]
-        
-        if not resume_degree:
-            violations.append({
-                "type": "CRITICAL",
-                "field": "Degree",
-                "message": f"❌ MISSING: JD requires '{jd_degree}' degree, but no degree found in resume."
-            })
-        elif jd_degree.lower() not in resume_degree.lower():
-            violations.append({
-                "type": "MISMATCH",
-                "field": "Degree",
-                "message": f"⚠️ MISMATCH: JD expects '{jd_degree}', but resume shows '{resume_degree}'."
-            })
-    
-    # 2. Branch Check
-    if jd_fields.get("branch"):
-        resume_branch = resume_fields.get("branch")
-        jd_branch = jd_fields["branch"]
-        
-        if not resume_branch:
-            violations.append({
-                "type": "CRITICAL",
-                "field": "Branch/Stream",
-                "message": f"❌ MISSING: JD requires '{jd_branch}' branch, but no branch/stream found in resume."
-            })
-        elif jd_branch.lower() not in resume_branch.lower():
-            violations.append({
-                "type": "MISMATCH",
-                "field": "Branch/Stream",
-                "message": f"⚠️ MISMATCH: JD expects '{jd_branch}', but resume shows '{resume_branch}'."
-            })
+    # 1-2. Degree / Branch: JD value must appear in the resume value
+    for key, label, missing_msg, mismatch_msg in _TEXT_REQUIREMENTS:
+        jd_value = jd_fields.get(key)
+        if not jd_value:
+            continue
+        resume_value = resume_fields.get(key)
+        if not resume_value:
+            violations.append({"type": "CRITICAL", "field": label,
+                               "message": missing_msg.format(jd=jd_value)})
+        elif jd_value.casefold() not in resume_value.casefold():
+            violations.append({"type": "MISMATCH", "field": label,
+                               "message": mismatch_msg.format(jd=jd_value, resume=resume_value)})
     
-    # 3. CGPA Check
-    if jd_fields.get("cgpa"):
-        resume_cgpa = resume_fields.get("cgpa")
-        jd_cgpa = jd_fields["cgpa"]
-        
-        if resume_cgpa is None:
-            violations.append({
-                "type": "CRITICAL",
-                "field": "CGPA/GPA",
-                "message": f"❌ MISSING: JD requires CGPA {jd_cgpa}+, but no CGPA mentioned in resume."
-            })
-        elif resume_cgpa < jd_cgpa:
-            violations.append({
-                "type": "CRITICAL",
-                "field": "CGPA/GPA",
-                "message": f"❌ BELOW CUTOFF: JD requires {jd_cgpa}, but resume shows {resume_cgpa}. This may disqualify you."
-            })
+    # 3-4. CGPA / Experience: resume value must reach the JD cutoff
+    for key, label, missing_msg, below_msg, pass_msg in _NUMERIC_REQUIREMENTS:
+        jd_value = jd_fields.get(key)
+        if not jd_value:
+            continue
+        resume_value = resume_fields.get(key)
+        if resume_value is None:
+            violations.append({"type": "CRITICAL", "field": label,
+                               "message": missing_msg.format(jd=jd_value)})
+        elif resume_value < jd_value:
+            violations.append({"type": "CRITICAL", "field": label,
+                               "message": below_msg.format(jd=jd_value, resume=resume_value)})
         else:
-            warnings.append({
-                "type": "PASS",
-                "field": "CGPA/GPA",
-                "message": f"✅ CGPA requirement met: {resume_cgpa} >= {jd_cgpa}"
-            })
-    
-    # 4. Experience Check
-    if jd_fields.get("experience"):
-        resume_exp = resume_fields.get("experience")
-        jd_exp = jd_fields["experience"]
-        
-        if resume_exp is None:
-            violations.append({
-                "type": "CRITICAL",
-                "field": "Experience",
-                "message": f"❌ MISSING: JD requires {jd_exp}+ years of experience, but no experience info found."
-            })
-        elif resume_exp < jd_exp:
-            violations.append({
-                "type": "CRITICAL",
-                "field": "Experience",
-                "message": f"❌ INSUFFICIENT: JD requires {jd_exp} years, but resume shows only {resume_exp} years."
-            })
-        else:
-            warnings.append({
-                "type": "PASS",
-                "field": "Experience",
-                "message": f"✅ Experience requirement met: {resume_exp} >= {jd_exp} years"
-            })
+            warnings.append({"type": "PASS", "field": label,
+                             "message": pass_msg.format(jd=jd_value, resume=resume_value)})
     
     return {
         "violations": violations,
@@ -168,6 +153,12 @@ Provide detailed, actionable feedback in exactly 5 points:
 
 Keep each point concise (2-3 sentences). Be direct and actionable."""
 
+    cache_key = hashlib.blake2b(f"{LLM_MODEL}|{prompt}".encode(), digest_size=16).hexdigest()
+    cached = _LLM_CACHE.get(cache_key)
+    if cached:
+        print("✅ LLM feedback served from cache")
+        return cached
+
     try:
         chat_completion = client.chat.completions.create(
             messages=[
@@ -180,13 +171,15 @@ Keep each point concise (2-3 sentences). Be direct and actionable."""
                     "content": prompt
                 }
             ],
-            model="llama-3.3-70b-versatile",
+            model=LLM_MODEL,
             temperature=0.7,
             max_tokens=700
         )
         
         llm_feedback = chat_completion.choices[0].message.content
         print("✅ LLM feedback generated successfully")
+        if llm_feedback:
+            _LLM_CACHE.set(cache_key, llm_feedback, expire=LLM_CACHE_TTL)
         return llm_feedback
     
     except Exception as e:
@@ -225,7 +218,8 @@ def generate_rule_based_feedback(resume_text, analysis_results, strict_validatio
         feedback.append("Resume length appears sufficient and provides good context.")
 
     # Section Check
-    if "experience" not in resume_text.lower() or "education" not in resume_text.lower():
+    sections = {m.group(1).casefold() for m in _SECTIONS_RE.finditer(resume_text)}
+    if not REQUIRED_SECTIONS <= sections:
         feedback.append("Ensure both 'Experience' and 'Education' sections are clearly present in your resume.")
 
     # Final Summary based on score
@@ -245,6 +239,15 @@ def generate_rule_based_feedback(resume_text, analysis_results, strict_validatio
 # -------------------------
 # Main Feedback Generator (HYBRID APPROACH)
 # -------------------------
+# Fixed lines of the strict-check section, built once
+_STRICT_HEADER = ("", "🚨 === STRICT ELIGIBILITY CHECK === 🚨", "")
+_PASSED_HEADER = ("", "✅ === REQUIREMENTS MET === ✅")
+_STRICT_CRITICAL_NOTE = (
+    "⚠️ WARNING: Your resume has critical mismatches that may result in automatic rejection by ATS systems or recruiters. "
+    "Address these issues immediately before applying."
+)
+_STRICT_MINOR_NOTE = "⚠️ Note: While these are not critical, addressing them will improve your chances."
+
 def generate_feedback(resume_text, analysis_results):
     """
     Main feedback function - HYBRID approach:
@@ -289,8 +292,8 @@ def generate_feedback(resume_text, analysis_results):
         )
         
         if llm_feedback:
-            # Parse LLM feedback into list
-            feedback_points = [line.strip() for line in llm_feedback.split('\n') if line.strip()]
+            # Parse LLM feedback into list (the API returns one entry per line)
+            feedback_points = [line for line in map(str.strip, llm_feedback.splitlines()) if line]
             feedback_type = "LLM-Powered (RAG Enhanced)"
     
     # STEP 4: Fall back to rule-based if LLM failed
@@ -298,34 +301,21 @@ def generate_feedback(resume_text, analysis_results):
         print("⚠️ Using rule-based feedback")
         rule_based = generate_rule_based_feedback(resume_text, analysis_results, strict_validation)
         feedback_points = rule_based["feedback"]
-        feedback_type = rule_based["feedbackType"]
+        feedback_type = "FastReject" if analysis_results.get("fastReject") else rule_based["feedbackType"]
     
     # STEP 5: ALWAYS append strict violations (regardless of LLM/rule-based)
     if strict_validation["violations"]:
-        feedback_points.append("")  # Empty line for separation
-        feedback_points.append("🚨 === STRICT ELIGIBILITY CHECK === 🚨")
+        feedback_points.extend(_STRICT_HEADER)
+        feedback_points.extend(v["message"] for v in strict_validation["violations"])
         feedback_points.append("")
-        
-        for violation in strict_validation["violations"]:
-            feedback_points.append(f"{violation['message']}")
-        
-        feedback_points.append("")
-        if strict_validation["has_critical_issues"]:
-            feedback_points.append(
-                "⚠️ WARNING: Your resume has critical mismatches that may result in automatic rejection by ATS systems or recruiters. "
-                "Address these issues immediately before applying."
-            )
-        else:
-            feedback_points.append(
-                "⚠️ Note: While these are not critical, addressing them will improve your chances."
-            )
+        feedback_points.append(
+            _STRICT_CRITICAL_NOTE if strict_validation["has_critical_issues"] else _STRICT_MINOR_NOTE
+        )
     
     # STEP 6: Add any passing checks as positive feedback
     if strict_validation["warnings"]:
-        feedback_points.append("")
-        feedback_points.append("✅ === REQUIREMENTS MET === ✅")
-        for warning in strict_validation["warnings"]:
-            feedback_points.append(warning["message"])
+        feedback_points.extend(_PASSED_HEADER)
+        feedback_points.extend(w["message"] for w in strict_validation["warnings"])
     
     return {
         "feedback": feedback_points,
@@ -5,7 +5,7 @@ from schemas import UserCreate, UserLogin, UserOut
 from jose import JWTError, jwt
 import os
 from utils import generate_token
-from database import collection
+from database import async_collection
 
 router = APIRouter()
 
@@ -14,7 +14,7 @@ async def signup(user: UserCreate, res: Response):
     if len(user.password) < 6:
         raise HTTPException(status_code=400, detail="Password must be at least 6 characters")
 
-    existing_user = collection.find_one({"email": user.email})
+    existing_user = await async_collection.find_one({"email": user.email})
     if existing_user:
         raise HTTPException(status_code=400, detail="User already exists")
 
@@ -26,7 +26,7 @@ async def signup(user: UserCreate, res: Response):
         "password": hashed_pw
     }
 
-    result = collection.insert_one(new_user)
+    result = await async_collection.insert_one(new_user)
     user_id = str(result.inserted_id)
 
     token = generate_token(user_id)
@@ -49,7 +49,7 @@ async def signup(user: UserCreate, res: Response):
 
 @router.post("/login", response_model=UserOut)
 async def login(user: UserLogin, res: Response):
-    db_user = collection.find_one({"email": user.email})
+    db_user = await async_collection.find_one({"email": user.email})
     if not db_user or not bcrypt.verify(user.password, db_user["password"]):
         raise HTTPException(status_code=400, detail="The credentials are wrong")
 
@@ -89,7 +89,7 @@ async def check_auth(request: Request):
         if not user_id:
             raise HTTPException(status_code=401, detail="Invalid token")
 
-        user = collection.find_one({"_id": ObjectId(user_id)})
+        user = await async_collection.find_one({"_id": ObjectId(user_id)})
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+One-off migration: store the MiniLM resume embedding on every resume
+document that doesn't have one yet, so /top-matches can skip encoding.
+
+Usage: python backfill_embeddings.py [--batch-size 64]
+"""
+
+import argparse
+from bson.binary import Binary
+from database import resume_collection
+from calculation import (
+    get_resume_artifacts, encode_texts, bert_model, EMBEDDING_MODEL_TAG
+)
+
+def backfill(batch_size):
+    if not bert_model:
+        print("❌ BERT model not available, nothing to do")
+        return
+
+    query = {"$or": [
+        {"embedding": {"$exists": False}},
+        {"embeddingModel": {"$ne": EMBEDDING_MODEL_TAG}},
+    ]}
+    cursor = resume_collection.find(query, {"resumeUrl": 1}).batch_size(batch_size)
+
+    done = failed = 0
+    batch = []
+
+    def flush():
+        nonlocal done, failed
+        embs = encode_texts([text for _, text in batch])
+        if embs is None:
+            failed += len(batch)
+        else:
+            for (doc_id, _), emb in zip(batch, embs):
+                resume_collection.update_one(
+                    {"_id": doc_id},
+                    {"$set": {"embedding": Binary(emb.tobytes()), "embeddingModel": EMBEDDING_MODEL_TAG}}
+                )
+                done += 1
+        batch.clear()
+        print(f"📊 {done} stored, {failed} failed")
+
+    for doc in cursor:
+        try:
+            text = get_resume_artifacts(doc["resumeUrl"])[0]
+        except Exception as e:
+            print(f"⚠️ Skipping {doc['_id']}: {e}")
+            failed += 1
+            continue
+        batch.append((doc["_id"], text))
+        if len(batch) >= batch_size:
+            flush()
+
+    if batch:
+        flush()
+
+    print(f"✅ Backfill complete: {done} stored, {failed} failed")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill resume embeddings")
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    print("🚀 Backfilling resume embeddings...")
+    backfill(args.batch_size)
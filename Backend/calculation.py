@@ -1,38 +1,73 @@
 
-import spacy
+import os
 import requests
-from io import BytesIO
-import fitz  # PyMuPDF
+import functools
+import hashlib
+from pathlib import Path
+import threading
+from collections import OrderedDict
 import re
 import torch
-import torch.nn.functional as F
-import json
 import faiss
+import ahocorasick
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from spacy.matcher import PhraseMatcher
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+from lxml import html as lxml_html
 from sentence_transformers import SentenceTransformer
+from ml_executor import STAGE_EXECUTOR
+from encoder_service import EncoderService
+from pdf_parser import extract_text_from_bytes
+from ai_feedback import validate_strict_requirements
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Load spaCy NLP model
+# Every encode goes through ENCODER's single worker, so that one batched
+# call gets all the cores as intra-op threads. TORCH_THREADS caps it when
+# other CPU-heavy work shares the host.
+torch.set_num_threads(int(os.getenv("TORCH_THREADS", str(os.cpu_count() or 1))))
 try:
-    nlp = spacy.load("en_core_web_sm")
-    logger.info("✅ spaCy model loaded")
-except OSError:
-    logger.warning("⚠️ spaCy model not found. Please run: python -m spacy download en_core_web_sm")
-    nlp = None
+    torch.set_num_interop_threads(1)
+except RuntimeError:
+    # Only settable before torch starts any parallel work
+    pass
+
+# Model tag saved next to each stored vector so a model swap can be detected
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
 
 # Load BERT model for RAG
 try:
-    bert_model = SentenceTransformer("all-MiniLM-L6-v2")
+    bert_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+    bert_model.eval()
     logger.info("✅ BERT model loaded for RAG")
 except Exception as e:
-    logger.error(f"⚠️ BERT model loading failed: {e}")
+    logger.error("⚠️ BERT model loading failed: %s", e)
     bert_model = None
 
+# Opt-in dynamic int8 quantization of the Linear layers for CPU inference.
+# Halves weight bandwidth and uses int8 GEMM kernels, but shifts similarity
+# scores; compare against FP32 on real resumes before setting BERT_QUANTIZE=1.
+BERT_QUANTIZED = False
+if bert_model is not None and bert_model.device.type == "cpu" and os.getenv("BERT_QUANTIZE", "0") == "1":
+    try:
+        bert_model = torch.quantization.quantize_dynamic(
+            bert_model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+        BERT_QUANTIZED = True
+        logger.info("✅ BERT model quantized to int8")
+    except Exception as e:
+        logger.error("⚠️ BERT quantization failed, using FP32: %s", e)
+
+# Model + precision of the vectors this process produces: int8 and FP32
+# embeddings don't mix, so stored/persisted vectors are tagged with it
+EMBEDDING_MODEL_TAG = f"{EMBEDDING_MODEL_NAME}-{'int8' if BERT_QUANTIZED else 'fp32'}"
+
+# Shared micro-batcher: concurrent requests' texts go through one encode() call.
+# A single worker owns the model: its tokenizer is not safe to share across
+# threads, and requests arriving during an encode coalesce into the next one.
+ENCODER = EncoderService(bert_model, max_batch=32, max_wait=0.005) if bert_model is not None else None
+
 # # Hugging Face API Token
 
 
@@ -44,58 +79,105 @@ skill_keywords = {
     "next.js", "vue", "angular", "express", "fastapi", "mysql", "postgres", "firebase"
 }
 
+# Single-pass Aho-Corasick automaton over all skill keywords
+SKILL_AUTOMATON = ahocorasick.Automaton()
+for _kw in skill_keywords:
+    SKILL_AUTOMATON.add_word(_kw, _kw)
+SKILL_AUTOMATON.make_automaton()
+
+# Stateless term-frequency vectorizer: nothing to fit, so it is shared by every call.
+# Rows come out L2-normalised, which makes cosine similarity a sparse dot product.
+TEXT_VECTORIZER = HashingVectorizer(n_features=2**18, alternate_sign=False, norm="l2")
+
+# Upper bound on how much of a company homepage is downloaded and parsed
+COMPANY_PAGE_MAX_BYTES = 512 * 1024
+
+# Opt-in: return straight after field extraction when a hard requirement fails
+FAST_REJECT = os.getenv("FAST_REJECT", "0") == "1"
+
+# Chunks handed to the LLM; resumes with this many or fewer skip the index
+RAG_TOP_K = 3
+
+# Resumes whose parsed text/embeddings are kept in memory
+RESUME_CACHE_SIZE = 2048
+
+# On-disk RAG artifacts per resume (embeddings + FAISS index), keyed by text hash,
+# so they survive restarts and are shared by every worker process. One
+# subdirectory per model and precision: vectors from another model are stale.
+RESUME_INDEX_DIR = Path(os.getenv("RESUME_INDEX_DIR", "./.resume_index_cache")) / EMBEDDING_MODEL_TAG
+
+# Below this many chunks an exact flat scan is cheaper than an HNSW graph
+HNSW_MIN_CHUNKS = 32
+
 known_degrees = ["btech", "mtech", "b.e", "m.e", "bachelor", "master", "phd"]
 known_branches = ["computer science", "information technology", "mechanical", "electrical", "electronics", "civil"]
 
+def _alternation(words):
+    # Longest first so "information technology" wins over any shorter prefix
+    return "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+
+# One compiled pattern for all four fields; the named group tells which one hit
+_FIELDS_RE = re.compile(
+    r"(?:cgpa|gpa)[^0-9]{0,5}(?P<cgpa>[0-9]\.\d+)"
+    r"|(?P<experience>\d+)\+?\s*(?:years|yrs)\s+(?:of\s+)?experience"
+    rf"|(?<!\w)(?P<degree>{_alternation(known_degrees)})(?!\w)"
+    rf"|(?<!\w)(?P<branch>{_alternation(known_branches)})(?!\w)"
+)
+
 # -------------------------
 # PDF Text Extraction
 # -------------------------
 def extract_text_from_url(pdf_url):
-    response = requests.get(pdf_url)
-    if response.status_code != 200:
-        raise Exception("Failed to download PDF")
-    doc = fitz.open(stream=BytesIO(response.content), filetype="pdf")
-    return "\n".join([page.get_text() for page in doc])
+    with requests.get(pdf_url, stream=True, timeout=15) as response:
+        if response.status_code != 200:
+            raise Exception("Failed to download PDF")
+        data = response.content
+    return extract_text_from_bytes(data)
 
 # -------------------------
 # Skill Extraction
 # -------------------------
-def extract_skills(text, keywords):
-    text = text.lower()
-    if not nlp:
-        return {k for k in keywords if k in text}
-    doc = nlp(text)
-    return {token.text for token in doc if token.text in keywords}
+def extract_skills(text_lower):
+    """
+    Find skill keywords in one pass over already case-folded text.
+    Matches must sit on word boundaries so "java" doesn't fire inside "javascript".
+    """
+    n = len(text_lower)
+    found = set()
+    for end, kw in SKILL_AUTOMATON.iter(text_lower):
+        start = end - len(kw) + 1
+        if start > 0 and text_lower[start - 1].isalnum():
+            continue
+        if end + 1 < n and text_lower[end + 1].isalnum():
+            continue
+        found.add(kw)
+    return frozenset(found)
 
 # -------------------------
 # Field Extraction (CGPA, Degree, Branch, Experience)
 # -------------------------
-def extract_fields(text):
-    lower = text.lower()
-    fields = {}
-
-    # CGPA or GPA
-    match = re.search(r'(?:cgpa|gpa)[^0-9]{0,5}([0-9]\.\d+)', lower)
-    fields["cgpa"] = float(match.group(1)) if match else None
-
-    # Experience
-    match = re.search(r'(\d+)\+?\s*(?:years|yrs)\s+(?:of\s+)?experience', lower)
-    fields["experience"] = int(match.group(1)) if match else None
-
-    # Degree & Branch using spaCy matcher
-    if nlp:
-        doc = nlp(lower)
-
-        degree_matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
-        degree_matcher.add("DEGREE", [nlp.make_doc(d) for d in known_degrees])
-        for _, start, end in degree_matcher(doc):
-            fields["degree"] = doc[start:end].text
-            break
+def extract_fields(text_lower):
+    """
+    Extract CGPA, experience, degree and branch from already case-folded
+    text in a single regex sweep. The first occurrence of each field wins.
+    """
+    fields = {"cgpa": None, "experience": None}
+    remaining = {"cgpa", "experience", "degree", "branch"}
 
-        branch_matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
-        branch_matcher.add("BRANCH", [nlp.make_doc(b) for b in known_branches])
-        for _, start, end in branch_matcher(doc):
-            fields["branch"] = doc[start:end].text
+    for match in _FIELDS_RE.finditer(text_lower):
+        name = match.lastgroup
+        if name not in remaining:
+            continue
+        remaining.discard(name)
+        value = match.group(name)
+        if name == "cgpa":
+            fields["cgpa"] = float(value)
+        elif name == "experience":
+            fields["experience"] = int(value)
+        else:
+            fields[name] = value
+        if not remaining:
+            # Every field found, no need to scan the rest of the document
             break
 
     return fields
@@ -104,11 +186,29 @@ def extract_fields(text):
 # TF-IDF Similarity
 # -------------------------
 def tfidf_similarity(t1, t2):
+    """
+    Lexical similarity of two documents. Named for compatibility; it now uses
+    hashed term frequencies, which need no per-call vocabulary fit.
+    """
     if not t1.strip() or not t2.strip():
         return 0.0
-    vectorizer = TfidfVectorizer()
-    vectors = vectorizer.fit_transform([t1, t2])
-    return cosine_similarity(vectors[0:1], vectors[1:2])[0][0] * 100
+    vectors = TEXT_VECTORIZER.transform([t1, t2])
+    return float(vectors[0].multiply(vectors[1]).sum()) * 100
+
+def tfidf_similarity_batch(jd_text, resume_texts, resume_matrix=None):
+    """
+    tfidf_similarity of one JD against many resumes: a single transform and
+    one sparse matrix-vector product. Returns a float array of scores x100.
+    Pass `resume_matrix` (rows already vectorized) to transform only the JD.
+    """
+    scores = np.zeros(len(resume_texts), dtype=np.float32)
+    if not resume_texts or not jd_text.strip():
+        return scores
+    if resume_matrix is None:
+        resume_matrix = TEXT_VECTORIZER.transform(resume_texts).astype(np.float32)
+    jd_vec = TEXT_VECTORIZER.transform([jd_text]).astype(np.float32)
+    scores[:] = (resume_matrix @ jd_vec.T).toarray().ravel() * 100
+    return scores
 
 # -------------------------
 # BERT Similarity using Local Model (NO API NEEDED!)
@@ -116,7 +216,8 @@ def tfidf_similarity(t1, t2):
 def bert_similarity(t1, t2):
     """
     Calculate semantic similarity using LOCAL SentenceTransformer model
-    This is much faster and more reliable than API calls!
+    Both texts are encoded in a single batch with normalized embeddings,
+    so cosine similarity reduces to a plain inner product.
     """
     if not t1.strip() or not t2.strip():
         return 0.0
@@ -127,30 +228,43 @@ def bert_similarity(t1, t2):
     
     try:
         # Use the SAME local model that RAG uses
-        emb1 = bert_model.encode(t1, convert_to_tensor=False)
-        emb2 = bert_model.encode(t2, convert_to_tensor=False)
-        
-        # Calculate cosine similarity
-        from numpy import dot
-        from numpy.linalg import norm
+        embs = ENCODER.encode([t1, t2])
+        score = float(embs[0] @ embs[1]) * 100
         
-        similarity = dot(emb1, emb2) / (norm(emb1) * norm(emb2))
-        score = float(similarity) * 100
-        
-        logger.info(f"✅ BERT similarity (local): {score:.2f}%")
+        logger.info("✅ BERT similarity (local): %.2f%%", score)
         return score
         
     except Exception as e:
-        logger.error(f"❌ Local BERT similarity failed: {e}")
+        logger.error("❌ Local BERT similarity failed: %s", e)
         return 0.0
 
+# -------------------------
+# Batched Encoding
+# -------------------------
+def encode_texts(texts):
+    """
+    Encode several texts in one padded batch (normalized embeddings),
+    coalesced with any concurrent callers by ENCODER.
+    Returns None if the model is missing or encoding fails.
+    """
+    if not bert_model:
+        logger.warning("⚠️ BERT model not available, skipping encode")
+        return None
+    try:
+        return ENCODER.encode(texts)
+    except Exception as e:
+        logger.error("❌ Batch encoding failed: %s", e)
+        return None
+
 # -------------------------
 # Skill Match Score
 # -------------------------
-def skill_match_score(resume_skills, jd_skills):
+def skill_match_score(resume_skills, jd_skills, matched=None):
     if not jd_skills:
         return 0.0
-    return (len(resume_skills & jd_skills) / len(jd_skills)) * 100
+    if matched is None:
+        matched = resume_skills & jd_skills
+    return (len(matched) / len(jd_skills)) * 100
 
 # -------------------------
 # Hybrid Score
@@ -158,41 +272,78 @@ def skill_match_score(resume_skills, jd_skills):
 def hybrid_score(skill_score, tfidf_score, bert_score, weights=(0.5, 0.2, 0.3)):
     return round(weights[0]*skill_score + weights[1]*tfidf_score + weights[2]*bert_score, 2)
 
+# -------------------------
+# RAG: Chunking
+# -------------------------
+def chunk_text(text, size=500, overlap=50):
+    """
+    Split text into fixed-size chunks; each chunk also carries the previous
+    `overlap` characters so words cut at a boundary appear whole in one chunk.
+    """
+    return [text[max(0, i - overlap):i + size] for i in range(0, len(text), size)]
+
 # -------------------------
 # RAG: Build FAISS Index
 # -------------------------
-def build_faiss_index(chunks):
-    """Build FAISS index from text chunks using BERT embeddings"""
+def build_faiss_index(chunks, embeddings=None):
+    """
+    Build FAISS index from text chunks using normalized BERT embeddings.
+    Pass `embeddings` when the chunks were already encoded in a shared batch.
+    """
     if not bert_model:
         logger.warning("⚠️ BERT model not available for RAG")
         return None, None
     
     try:
-        embeddings = bert_model.encode(chunks, convert_to_numpy=True)
+        if embeddings is None:
+            embeddings = ENCODER.encode(chunks)
         d = embeddings.shape[1]
-        index = faiss.IndexFlatL2(d)
+        # Inner product on unit vectors == cosine similarity
+        if len(chunks) < HNSW_MIN_CHUNKS:
+            index = faiss.IndexFlatIP(d)
+        else:
+            index = faiss.IndexHNSWFlat(d, 32, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = 40
         index.add(embeddings)
-        logger.info(f"✅ FAISS index built with {len(chunks)} chunks")
+        logger.info("✅ FAISS index built with %s chunks", len(chunks))
         return index, embeddings
     except Exception as e:
-        logger.error(f"❌ FAISS indexing failed: {e}")
+        logger.error("❌ FAISS indexing failed: %s", e)
         return None, None
 
+# -------------------------
+# RAG: Cached Query Embedding
+# -------------------------
+@functools.lru_cache(maxsize=256)
+def _encode_query(query_text):
+    """
+    Encode a query (usually the JD) once and reuse it across resumes.
+    The returned array is read-only because it is shared between callers.
+    """
+    emb = ENCODER.encode([query_text])
+    emb.setflags(write=False)
+    return emb
+
 # -------------------------
 # RAG: Retrieve Top Chunks
 # -------------------------
 def retrieve_top_chunks(index, chunks, query_text, top_k=3):
     """Retrieve most relevant chunks using FAISS"""
     if not bert_model or index is None:
-        return chunks[:top_k]  # Fallback to first chunks
+        return [str(c) for c in chunks[:top_k]]  # Fallback to first chunks
     
     try:
-        query_emb = bert_model.encode([query_text], convert_to_numpy=True)
+        query_emb = _encode_query(query_text)
+        if isinstance(index, faiss.IndexHNSW):
+            index.hnsw.efSearch = max(top_k * 4, 16)
         D, I = index.search(query_emb, k=min(top_k, len(chunks)))
-        return [chunks[i] for i in I[0]]
+        ids = I[0][I[0] >= 0]  # FAISS pads missing hits with -1
+        # Gather with one fancy-index on the object array instead of a Python loop
+        chunk_arr = chunks if isinstance(chunks, np.ndarray) else np.asarray(chunks, dtype=object)
+        return chunk_arr[ids].tolist()
     except Exception as e:
-        logger.error(f"❌ RAG retrieval failed: {e}")
-        return chunks[:top_k]
+        logger.error("❌ RAG retrieval failed: %s", e)
+        return [str(c) for c in chunks[:top_k]]
 
 # -------------------------
 # Web Scraping: Extract Company Info
@@ -206,46 +357,352 @@ def scrape_company_info(company_url):
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
-        response = requests.get(company_url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        # Simple text extraction (you can enhance with BeautifulSoup)
-        from bs4 import BeautifulSoup
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Get text from common sections
+        # Stream the page and stop reading at the byte cap; the useful text
+        # sits near the top, the tail is mostly scripts and footers
+        body = bytearray()
+        with requests.get(company_url, headers=headers, timeout=10, stream=True) as response:
+            response.raise_for_status()
+            for chunk in response.iter_content(chunk_size=8192):
+                body.extend(chunk)
+                if len(body) >= COMPANY_PAGE_MAX_BYTES:
+                    break
+
+        # lxml's C parser copes with the truncated document
+        tree = lxml_html.fromstring(bytes(body[:COMPANY_PAGE_MAX_BYTES]))
+
+        # Get text from common sections, first 50 useful snippets only
         text_content = []
-        for tag in soup.find_all(['p', 'h1', 'h2', 'h3', 'li']):
-            text = tag.get_text(strip=True)
+        for tag in tree.iter('p', 'h1', 'h2', 'h3', 'li'):
+            text = tag.text_content().strip()
             if len(text) > 20:  # Filter short snippets
                 text_content.append(text)
+                if len(text_content) >= 50:
+                    break
         
-        company_info = " ".join(text_content[:50])  # Limit to first 50 paragraphs
-        logger.info(f"✅ Scraped {len(company_info)} chars from {company_url}")
+        company_info = " ".join(text_content)
+        logger.info("✅ Scraped %s chars from %s", len(company_info), company_url)
         return company_info
     
     except Exception as e:
-        logger.warning(f"⚠️ Company scraping failed: {e}")
+        logger.warning("⚠️ Company scraping failed: %s", e)
         return ""
 
+# -------------------------
+# Per-Resume Memoization
+# -------------------------
+class BoundedCache:
+    """Thread-safe LRU mapping with a fixed number of entries"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+# Full-resume embedding per URL; filled in bulk by score_resumes_against_jd
+RESUME_DOC_EMBEDDINGS = BoundedCache(RESUME_CACHE_SIZE)
+
+# Parsed resume per URL: (text, chunks, skills, fields)
+RESUME_ARTIFACTS = BoundedCache(RESUME_CACHE_SIZE)
+
+def get_resume_artifacts(resume_url, resume_text=None):
+    """
+    Download, parse and scan a resume once per URL (uploaded resumes are
+    immutable). Pass `resume_text` when the PDF was already fetched and parsed;
+    if it differs from the cached text (a replaced Drive file) it is rescanned.
+    Returns (text, chunks, skills, fields); callers must not mutate them.
+    """
+    cached = RESUME_ARTIFACTS.get(resume_url)
+    if cached is not None and (resume_text is None or cached[0] == resume_text):
+        return cached
+    if cached is not None:
+        # The file behind the URL changed: drop what was derived from the old text
+        RESUME_DOC_EMBEDDINGS.pop(resume_url)
+        RESUME_TF_VECTORS.pop(resume_url)
+    text = resume_text if resume_text is not None else extract_text_from_url(resume_url)
+    text_lower = text.casefold()
+    # Object array: shared read-only, and retrieval gathers from it by index arrays
+    chunks = np.asarray(chunk_text(text), dtype=object)
+    chunks.setflags(write=False)
+    artifacts = (text, chunks, extract_skills(text_lower), extract_fields(text_lower))
+    RESUME_ARTIFACTS.put(resume_url, artifacts)
+    return artifacts
+
+# Embedding matrix and FAISS index per on-disk path, i.e. per resume text.
+# Read fully into memory: a few KB each, not worth a mapping per cached resume.
+RESUME_EMBEDDINGS = BoundedCache(RESUME_CACHE_SIZE)
+RESUME_INDEXES = BoundedCache(RESUME_CACHE_SIZE)
+
+def get_resume_embeddings(resume_url):
+    """
+    Normalized embeddings for a resume: row 0 is the full text, the rest are
+    its chunks (only when there are more than RAG_TOP_K of them). Kept apart
+    from get_resume_artifacts so fast-rejected resumes are never encoded.
+    """
+    text, chunks, _, _ = get_resume_artifacts(resume_url)
+    path = _resume_cache_path(text, ".npy")
+    embs = RESUME_EMBEDDINGS.get(path)
+    if embs is None and path.exists():
+        try:
+            embs = np.load(path)
+        except Exception as e:
+            logger.warning("⚠️ Ignoring unreadable embedding cache %s: %s", path.name, e)
+    if embs is None:
+        embs = encode_texts([text] + (chunks.tolist() if len(chunks) > RAG_TOP_K else []))
+        if embs is None:
+            # Raise rather than return, so a failed encode is not memoized
+            raise RuntimeError(f"Resume encoding failed for {resume_url}")
+        _persist(path, lambda tmp: _save_array(tmp, embs))
+    embs.setflags(write=False)
+    RESUME_EMBEDDINGS.put(path, embs)
+    RESUME_DOC_EMBEDDINGS.put(resume_url, embs[0])
+    return embs
+
+def get_resume_index(resume_url):
+    """FAISS index over a resume's chunks, persisted next to its embeddings"""
+    text, chunks, _, _ = get_resume_artifacts(resume_url)
+    path = _resume_cache_path(text, ".faiss")
+    index = RESUME_INDEXES.get(path)
+    if index is None and path.exists():
+        try:
+            index = faiss.read_index(str(path))
+        except Exception as e:
+            logger.warning("⚠️ Ignoring unreadable index cache %s: %s", path.name, e)
+    if index is None:
+        embs = np.ascontiguousarray(get_resume_embeddings(resume_url)[1:], dtype=np.float32)
+        index, _ = build_faiss_index(chunks, embs)
+        if index is None:
+            raise RuntimeError(f"Index build failed for {resume_url}")
+        _persist(path, lambda tmp: faiss.write_index(index, tmp))
+    RESUME_INDEXES.put(path, index)
+    return index
+
+def _resume_cache_path(resume_text, suffix):
+    # Chunks are derived deterministically from the text, so the text hash
+    # identifies embeddings and index alike; no separate chunk side-file needed
+    return RESUME_INDEX_DIR / (hashlib.sha1(resume_text.encode("utf-8")).hexdigest() + suffix)
+
+def _save_array(path, array):
+    # Through a file object, so np.save doesn't append ".npy" to the temp name
+    with open(path, "wb") as f:
+        np.save(f, array)
+
+def _persist(path, write):
+    """Write via a temp file + rename so readers never see a partial file"""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + f".{os.getpid()}.{threading.get_ident()}.tmp")
+        write(str(tmp))
+        os.replace(tmp, path)
+    except Exception as e:
+        logger.warning("⚠️ Could not persist %s: %s", path.name, e)
+
+# -------------------------
+# Stored Embeddings (MongoDB)
+# -------------------------
+def embedding_bytes(emb):
+    """Embedding as raw float32 bytes for storage"""
+    return np.ascontiguousarray(emb, dtype=np.float32).tobytes()
+
+def load_stored_embeddings(stored):
+    """Seed the in-memory embedding cache from {url: float32 bytes} read from MongoDB"""
+    if not bert_model:
+        return
+    dim = bert_model.get_sentence_embedding_dimension()
+    for url, blob in stored.items():
+        if len(blob) != dim * 4:
+            continue  # written by a different model, re-encode instead
+        if RESUME_DOC_EMBEDDINGS.get(url) is None:
+            RESUME_DOC_EMBEDDINGS.put(url, np.frombuffer(blob, dtype=np.float32))
+
+# Hashed term-frequency row per resume URL; the vectorizer is stateless,
+# so rows never go stale and new uploads need no corpus refit
+RESUME_TF_VECTORS = BoundedCache(RESUME_CACHE_SIZE)
+
+def _resume_tf_matrix(resume_urls, resume_texts):
+    """Stack cached TF rows into one CSR matrix, vectorizing only the misses"""
+    rows = [RESUME_TF_VECTORS.get(url) for url in resume_urls]
+    missing = [j for j, row in enumerate(rows) if row is None]
+    if missing:
+        fresh = TEXT_VECTORIZER.transform([resume_texts[j] for j in missing]).astype(np.float32)
+        for k, j in enumerate(missing):
+            rows[j] = fresh[k]
+            RESUME_TF_VECTORS.put(resume_urls[j], rows[j])
+    return sparse.vstack(rows, format="csr")
+
+def _resume_artifacts_or_none(resume_url, resume_text=None):
+    try:
+        return get_resume_artifacts(resume_url, resume_text)
+    except Exception as e:
+        logger.error("⚠️ Could not load resume %s: %s", resume_url, e)
+        return None
+
+# -------------------------
+# Warmup
+# -------------------------
+_WARMUP_TEXT = "python developer with aws, docker and machine learning experience"
+
+def warm_up_models():
+    """
+    One tiny BERT encode, TF-IDF transform and skill scan, so lazy torch /
+    int8 kernel initialization happens at startup instead of in the first request
+    """
+    encode_texts([_WARMUP_TEXT, "resume"])
+    TEXT_VECTORIZER.transform([_WARMUP_TEXT])
+    extract_skills(_WARMUP_TEXT)
+    logger.info("✅ ML models warmed up")
+
+# -------------------------
+# Batch Scoring (HR Top Matches)
+# -------------------------
+def score_resumes_against_jd(resume_urls, jd_text, resume_texts=None, stored_embeddings=None):
+    """
+    Score many resumes against one JD without RAG.
+    `resume_texts` maps URL -> already parsed text; anything else is downloaded here.
+    `stored_embeddings` maps URL -> float32 bytes saved at upload time; passed
+    in (not pre-seeded by the caller) so it also reaches worker processes.
+    Uncached resumes are encoded in a single batch and BERT scores come
+    from one matrix-vector product.
+    Returns one dict per URL (None where the resume could not be loaded).
+    """
+    resume_texts = resume_texts or {}
+    if stored_embeddings:
+        load_stored_embeddings(stored_embeddings)
+    jd_skills = extract_skills(jd_text.casefold())
+
+    # Phase 1: download + parse (memoized per URL)
+    artifacts = list(STAGE_EXECUTOR.map(
+        _resume_artifacts_or_none, resume_urls, [resume_texts.get(url) for url in resume_urls]
+    ))
+    loaded = [i for i, a in enumerate(artifacts) if a is not None]
+    if not loaded:
+        return [None] * len(resume_urls)
+
+    # Phase 2: BERT scores for every loaded resume at once
+    bert_scores = np.zeros(len(loaded), dtype=np.float32)
+    if bert_model and jd_text.strip():
+        doc_embs = [RESUME_DOC_EMBEDDINGS.get(resume_urls[i]) for i in loaded]
+        missing = [j for j, emb in enumerate(doc_embs) if emb is None]
+        if missing:
+            fresh = encode_texts([artifacts[loaded[j]][0] for j in missing])
+            if fresh is not None:
+                for j, emb in zip(missing, fresh):
+                    emb.setflags(write=False)
+                    RESUME_DOC_EMBEDDINGS.put(resume_urls[loaded[j]], emb)
+                    doc_embs[j] = emb
+        have = [j for j, emb in enumerate(doc_embs) if emb is not None]
+        if have:
+            matrix = np.stack([doc_embs[j] for j in have])
+            bert_scores[have] = (matrix @ _encode_query(jd_text)[0]) * 100
+
+    # Phase 3: lexical scores in one sparse product (resume rows precomputed
+    # once per URL, so only the JD is vectorized), then per-resume skill scores
+    loaded_texts = [artifacts[i][0] for i in loaded]
+    resume_matrix = _resume_tf_matrix([resume_urls[i] for i in loaded], loaded_texts)
+    tfidf_scores = tfidf_similarity_batch(jd_text, loaded_texts, resume_matrix)
+    results = [None] * len(resume_urls)
+    for j, i in enumerate(loaded):
+        text, _, resume_skills, _ = artifacts[i]
+        matched = resume_skills & jd_skills
+        skill_score = skill_match_score(resume_skills, jd_skills, matched)
+        tfidf_score = float(tfidf_scores[j])
+        bert_score = float(bert_scores[j]) if text.strip() else 0.0
+        results[i] = {
+            "matchedSkills": sorted(matched),
+            "skillScore": round(skill_score, 2),
+            "tfidfScore": round(tfidf_score, 2),
+            "bertScore": round(bert_score, 2),
+            "hybridScore": hybrid_score(skill_score, tfidf_score, bert_score)
+        }
+    return results
+
 # -------------------------
 # Main Analysis Function with RAG
 # -------------------------
-def analyze_resume_against_jd(resume_url, jd_text, company_name=None, company_url=None):
+def analyze_resume_against_jd(resume_url, jd_text, company_name=None, company_url=None, resume_text=None):
     """
     Enhanced resume analysis with RAG support
+    Pass `resume_text` when the PDF was already fetched and parsed.
     """
     try:
-        resume_text = extract_text_from_url(resume_url)
-        resume_skills = extract_skills(resume_text, skill_keywords)
-        jd_skills = extract_skills(jd_text, skill_keywords)
-        resume_fields = extract_fields(resume_text)
-        jd_fields = extract_fields(jd_text)
+        # Company scraping is pure network I/O and independent of the resume,
+        # so it overlaps with the PDF download and scoring below
+        company_future = STAGE_EXECUTOR.submit(scrape_company_info, company_url) if company_url else None
+
+        # Resume-side work is memoized per URL; only JD-side work repeats
+        resume_text, resume_chunks, resume_skills, resume_fields = get_resume_artifacts(resume_url, resume_text)
+        resume_fields = dict(resume_fields)  # the cached dict is shared
+
+        jd_lower = jd_text.casefold()
+        jd_skills = extract_skills(jd_lower)
+        jd_fields = extract_fields(jd_lower)
+
+        matched_skills = resume_skills & jd_skills
+        missing_skills = jd_skills - resume_skills
+
+        # Hard eligibility gate: skip BERT, RAG and scraping for certain rejects
+        if FAST_REJECT:
+            strict = validate_strict_requirements(resume_text, {"resumeFields": resume_fields, "jdFields": jd_fields})
+            if strict["has_critical_issues"]:
+                if company_future:
+                    company_future.cancel()
+                logger.info("⏩ Fast reject: critical eligibility mismatch, skipping BERT/RAG")
+                return {
+                    "resumeText": resume_text,
+                    "resumeSkills": sorted(resume_skills),
+                    "jdSkills": sorted(jd_skills),
+                    "matchedSkills": sorted(matched_skills),
+                    "missingSkills": sorted(missing_skills),
+                    "resumeFields": resume_fields,
+                    "jdFields": jd_fields,
+                    "skillScore": 0.0, "tfidfScore": 0.0, "bertScore": 0.0, "hybridScore": 0.0,
+                    "ragData": {"topChunks": [], "companyInfo": "", "ragEnabled": False},
+                    "companyName": company_name or "N/A",
+                    "companyUrl": company_url or "N/A",
+                    "resumeEmbedding": None,
+                    "fastReject": True
+                }
+
+        # With top_k or fewer chunks every chunk is returned anyway,
+        # so they need no encoding or index
+        top_k = RAG_TOP_K
+        index_chunks = len(resume_chunks) > top_k
+
+        # Resume + chunk embeddings in one batch, cached per URL after the first encode.
+        # BERT (torch) and TF-IDF (scipy/numpy) release the GIL, run them alongside
+        embed_future = STAGE_EXECUTOR.submit(get_resume_embeddings, resume_url) if bert_model else None
+        tfidf_future = STAGE_EXECUTOR.submit(tfidf_similarity, resume_text, jd_text)
+
+        # The JD vector comes from the query cache shared across resumes
+        jd_emb = _encode_query(jd_text) if bert_model else None
 
         # Calculate basic scores
-        skill_score = skill_match_score(resume_skills, jd_skills)
-        tfidf_score = tfidf_similarity(resume_text, jd_text)
-        bert_score = bert_similarity(resume_text, jd_text)
+        skill_score = skill_match_score(resume_skills, jd_skills, matched_skills)
+        tfidf_score = tfidf_future.result()
+        embs = None
+        if embed_future:
+            try:
+                embs = embed_future.result()
+            except RuntimeError as e:
+                logger.error("❌ %s", e)
+        bert_score = float(embs[0] @ jd_emb[0]) * 100 if embs is not None else 0.0
         final_score = hybrid_score(skill_score, tfidf_score, bert_score)
 
         # --- RAG Enhancement ---
@@ -254,31 +711,33 @@ def analyze_resume_against_jd(resume_url, jd_text, company_name=None, company_ur
             "companyInfo": "",
             "ragEnabled": False
         }
-
-        # Chunk resume for RA2
-        chunk_size = 500
-        resume_chunks = [resume_text[i:i+chunk_size] for i in range(0, len(resume_text), chunk_size)]
         
-        # Build FAISS index and retrieve relevant chunks
-        if bert_model:
-            index, _ = build_faiss_index(resume_chunks)
-            if index:
-                top_chunks = retrieve_top_chunks(index, resume_chunks, jd_text, top_k=3)
+        # Build FAISS index from the batch above and retrieve relevant chunks
+        if embs is not None:
+            if not index_chunks:
+                top_chunks = resume_chunks.tolist()
+            else:
+                try:
+                    index = get_resume_index(resume_url)
+                except RuntimeError as e:
+                    logger.error("❌ %s", e)
+                    index = None
+                top_chunks = retrieve_top_chunks(index, resume_chunks, jd_text, top_k=top_k) if index else None
+            if top_chunks is not None:
                 rag_data["topChunks"] = top_chunks
                 rag_data["ragEnabled"] = True
-                logger.info(f"✅ RAG enabled: Retrieved {len(top_chunks)} relevant chunks")
+                logger.info("✅ RAG enabled: Retrieved %s relevant chunks", len(top_chunks))
 
-        # Scrape company website if URL provided
-        if company_url:
-            company_info = scrape_company_info(company_url)
-            rag_data["companyInfo"] = company_info
+        # Company website text (scraped concurrently above)
+        if company_future:
+            rag_data["companyInfo"] = company_future.result()
 
         return {
             "resumeText": resume_text,
             "resumeSkills": sorted(resume_skills),
             "jdSkills": sorted(jd_skills),
-            "matchedSkills": sorted(resume_skills & jd_skills),
-            "missingSkills": sorted(jd_skills - resume_skills),
+            "matchedSkills": sorted(matched_skills),
+            "missingSkills": sorted(missing_skills),
             "resumeFields": resume_fields,
             "jdFields": jd_fields,
             "skillScore": round(skill_score, 2),
@@ -287,16 +746,20 @@ def analyze_resume_against_jd(resume_url, jd_text, company_name=None, company_ur
             "hybridScore": final_score,
             "ragData": rag_data,
             "companyName": company_name or "N/A",
-            "companyUrl": company_url or "N/A"
+            "companyUrl": company_url or "N/A",
+            # Float32 bytes for storage; returned rather than read back from this
+            # process's cache, which a worker-process caller never sees
+            "resumeEmbedding": embedding_bytes(embs[0]) if embs is not None else None
         }
 
     except Exception as e:
-        logger.error(f"❌ Error in analysis: {e}")
+        logger.error("❌ Error in analysis: %s", e)
         return {
             "resumeText": "",
             "resumeSkills": [], "jdSkills": [], "matchedSkills": [], "missingSkills": [],
             "resumeFields": {}, "jdFields": {},
             "skillScore": 0.0, "tfidfScore": 0.0, "bertScore": 0.0, "hybridScore": 0.0,
             "ragData": {"topChunks": [], "companyInfo": "", "ragEnabled": False},
-            "companyName": "N/A", "companyUrl": "N/A"
+            "companyName": "N/A", "companyUrl": "N/A",
+            "resumeEmbedding": None
         }
@@ -1,4 +1,5 @@
 from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
 from dotenv import load_dotenv
 import os
@@ -18,6 +19,8 @@ class DatabaseSingleton:
     _lock = Lock()
     _client = None
     _db = None
+    _async_client = None
+    _async_db = None
     
     def __new__(cls):
         if cls._instance is None:
@@ -40,19 +43,23 @@ class DatabaseSingleton:
         if not MONGO_URI:
             raise ValueError("MONGODB_URI not found in environment variables")
         
+        # Connection pooling configuration for production
+        options = dict(
+            maxPoolSize=50,  # Maximum number of connections in pool
+            minPoolSize=10,  # Minimum number of connections in pool
+            maxIdleTimeMS=45000,  # Close connections after 45s of inactivity
+            serverSelectionTimeoutMS=5000,  # Timeout for server selection
+            connectTimeoutMS=10000,  # Connection timeout
+            socketTimeoutMS=20000,  # Socket timeout
+            retryWrites=True,  # Retry write operations on network errors
+            retryReads=True    # Retry read operations on network errors
+        )
+        
         try:
-            # Connection pooling configuration for production
-            self._client = MongoClient(
-                MONGO_URI,
-                maxPoolSize=50,  # Maximum number of connections in pool
-                minPoolSize=10,  # Minimum number of connections in pool
-                maxIdleTimeMS=45000,  # Close connections after 45s of inactivity
-                serverSelectionTimeoutMS=5000,  # Timeout for server selection
-                connectTimeoutMS=10000,  # Connection timeout
-                socketTimeoutMS=20000,  # Socket timeout
-                retryWrites=True,  # Retry write operations on network errors
-                retryReads=True    # Retry read operations on network errors
-            )
+            self._client = MongoClient(MONGO_URI, **options)
+            # Motor client for async endpoints: same pool settings, awaited on
+            # the event loop instead of blocking it (connects on first use)
+            self._async_client = AsyncIOMotorClient(MONGO_URI, **options)
             
             # Test connection
             self._client.admin.command('ping')
@@ -60,12 +67,13 @@ class DatabaseSingleton:
             
             # Get database
             self._db = self._client.resume_db
+            self._async_db = self._async_client.resume_db
             
         except (ConnectionFailure, ServerSelectionTimeoutError) as e:
-            logger.error(f"❌ MongoDB connection failed: {e}")
+            logger.error("❌ MongoDB connection failed: %s", e)
             raise
         except Exception as e:
-            logger.error(f"❌ Unexpected database error: {e}")
+            logger.error("❌ Unexpected database error: %s", e)
             raise
     
     @property
@@ -92,8 +100,27 @@ class DatabaseSingleton:
         """Get resumes collection"""
         return self.db.resumes
     
+    @property
+    def async_db(self):
+        """Get Motor (async) database instance"""
+        if self._async_db is None:
+            self._connect()
+        return self._async_db
+    
+    @property
+    def async_collection(self):
+        """Get user_data collection (Motor)"""
+        return self.async_db["user_data"]
+    
+    @property
+    def async_resume_collection(self):
+        """Get resumes collection (Motor)"""
+        return self.async_db.resumes
+    
     def close(self):
         """Close database connection"""
+        if self._async_client:
+            self._async_client.close()
         if self._client:
             self._client.close()
             logger.info("MongoDB connection closed")
@@ -106,3 +133,7 @@ collection = _db_singleton.collection
 resume_collection = _db_singleton.resume_collection
 client = _db_singleton.client
 db = _db_singleton.db
+
+# Async (Motor) collections; await their methods from async endpoints
+async_collection = _db_singleton.async_collection
+async_resume_collection = _db_singleton.async_resume_collection
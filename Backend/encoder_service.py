@@ -0,0 +1,113 @@
+"""
+Micro-batching front end for a SentenceTransformer
+Concurrent callers' texts are coalesced into one encode() call
+"""
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+import torch
+
+logger = logging.getLogger(__name__)
+
+class EncoderService:
+    """
+    Callers submit texts from any thread; the worker drains the queue into
+    batches of up to `max_batch` texts, runs one normalized encode and hands
+    each caller back its own rows. A lone request is encoded at once; only
+    when several are already queued does it wait up to `max_wait` seconds
+    for stragglers. The model's tokenizer is not thread-safe, so keep
+    `num_workers` at 1 unless each worker gets its own model.
+    """
+
+    def __init__(self, model, max_batch=32, max_wait=0.005, num_workers=1):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"encoder_{i}", daemon=True)
+            for i in range(num_workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, texts):
+        """Queue texts for encoding; returns a Future of an (n, dim) float32 array"""
+        future = Future()
+        self._queue.put((list(texts), future))
+        return future
+
+    def encode(self, texts):
+        """Blocking encode, for code already running in a worker thread"""
+        return self.submit(texts).result()
+
+    async def aencode(self, texts):
+        """Awaitable encode, for code running on the event loop"""
+        return await asyncio.wrap_future(self.submit(texts))
+
+    def close(self):
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            count = len(item[0])
+            deadline = None
+            while count < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    if len(batch) == 1:
+                        break
+                    # Under load: linger briefly so the batch fills up
+                    if deadline is None:
+                        deadline = time.monotonic() + self.max_wait
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                if item is None:
+                    # Leave the stop signal for this thread's next loop
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+                count += len(item[0])
+            self._run(batch)
+
+    def _run(self, batch):
+        texts = [text for texts, _ in batch for text in texts]
+        try:
+            if texts:
+                with torch.inference_mode():
+                    embs = self.model.encode(
+                        texts,
+                        batch_size=self.max_batch,
+                        convert_to_numpy=True,
+                        normalize_embeddings=True
+                    )
+            else:
+                embs = np.empty((0, self.model.get_sentence_embedding_dimension()), dtype=np.float32)
+        except Exception as e:
+            logger.error("❌ Batched encode of %s texts failed: %s", len(texts), e)
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        offset = 0
+        for texts, future in batch:
+            future.set_result(embs[offset:offset + len(texts)])
+            offset += len(texts)
@@ -43,7 +43,7 @@ def serialize_resume(doc):
 @router.get("/")
 def get_resumes_for_email(email: str = Query(..., description="User email to fetch resumes")):
     try:
-        resumes_cursor = resume_collection.find({"email": email}).sort("scores.hybridScore", -1)
+        resumes_cursor = resume_collection.find({"email": email}, {"embedding": 0}).sort("scores.hybridScore", -1)
         resumes = list(resumes_cursor)
 
         if not resumes:
@@ -75,7 +75,7 @@ def get_resumes_for_authenticated_user(request: Request):
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         email = user["email"]
-        resumes_cursor = resume_collection.find({"email": email}).sort("scores.hybridScore", -1)
+        resumes_cursor = resume_collection.find({"email": email}, {"embedding": 0}).sort("scores.hybridScore", -1)
         resumes = list(resumes_cursor)
         return {
             "email": email,
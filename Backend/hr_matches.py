@@ -1,7 +1,9 @@
 from fastapi import APIRouter, Form, HTTPException
-from database import resume_collection
-from calculation import analyze_resume_against_jd
-from ml_executor import execute_ml_work
+from database import async_resume_collection
+from calculation import score_resumes_against_jd, RESUME_ARTIFACTS, EMBEDDING_MODEL_TAG
+from pdf_fetcher import fetch_pdfs
+from ml_executor import execute_ml_work, PDF_POOL
+from pdf_parser import extract_text_from_bytes
 from bson import ObjectId
 import logging
 import asyncio
@@ -10,63 +12,143 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-async def analyze_single_resume(resume_data, jd_text):
-    """Analyze a single resume - runs in thread pool (non-blocking)"""
+# Documents per MongoDB round trip, and pages buffered ahead of the consumer
+MONGO_BATCH_SIZE = 100
+MAX_PENDING_PAGES = 4
+
+RESUME_PROJECTION = {
+    "resumeUrl": 1,
+    "email": 1,
+    "driveUrl": 1,
+    "embedding": 1,
+    "embeddingModel": 1,
+    "_id": 1
+}
+
+async def _produce_resume_pages(queue):
+    """
+    Page through the resume cursor (Motor, awaited on the loop); None marks
+    the end, also after a cursor error (re-raised to whoever awaits the task)
+    """
+    cursor = async_resume_collection.find({}, RESUME_PROJECTION).batch_size(MONGO_BATCH_SIZE)
+    cancelled = False
     try:
-        resume_url = resume_data["resumeUrl"]
-        email = resume_data["email"]
-        drive_url = resume_data.get("driveUrl", "")
-        resume_id = resume_data["_id"]
-
-        # Run ML analysis in thread pool (non-blocking)
-        analysis = await execute_ml_work(
-            analyze_resume_against_jd,
-            resume_url=resume_url,
-            jd_text=jd_text
-        )
+        while True:
+            page = await cursor.to_list(length=MONGO_BATCH_SIZE)
+            if not page:
+                break
+            await queue.put(page)
+    except asyncio.CancelledError:
+        cancelled = True  # the consumer is gone, nobody to signal
+        raise
+    finally:
+        await cursor.close()
+        if not cancelled:
+            await queue.put(None)
 
-        return {
-            "resumeId": str(resume_id),
-            "email": email,
-            "resumeUrl": resume_url,
-            "driveUrl": drive_url,
-            "matchedSkills": analysis["matchedSkills"],
-            "scores": {
-                "skillScore": analysis["skillScore"],
-                "tfidfScore": analysis["tfidfScore"],
-                "bertScore": analysis["bertScore"],
-                "hybridScore": analysis["hybridScore"]
-            }
-        }
-    except Exception as e:
-        logger.error(f"⚠️ Error analyzing resume {resume_data.get('_id')}: {e}")
-        return None
+async def _prefetch_resume_texts(resume_urls):
+    """Download (async) and parse (process pool) PDFs that aren't cached yet"""
+    uncached = [url for url in dict.fromkeys(resume_urls) if RESUME_ARTIFACTS.get(url) is None]
+    pdf_bytes = await fetch_pdfs(uncached)
+
+    loop = asyncio.get_running_loop()
+    fetched_urls = list(pdf_bytes)
+    parsed = await asyncio.gather(
+        *(loop.run_in_executor(PDF_POOL, extract_text_from_bytes, pdf_bytes[url]) for url in fetched_urls),
+        return_exceptions=True
+    )
+    resume_texts = {}
+    for url, text in zip(fetched_urls, parsed):
+        if isinstance(text, Exception):
+            logger.error("⚠️ PDF parsing failed for %s: %s", url, text)
+        else:
+            resume_texts[url] = text
+    return resume_texts
+
+def _usable_resumes(page):
+    """Drop (and log) legacy documents without the fields matching needs"""
+    usable = []
+    for resume in page:
+        if resume.get("resumeUrl") and resume.get("email"):
+            usable.append(resume)
+        else:
+            logger.error("⚠️ Skipping resume %s: missing resumeUrl or email", resume.get("_id"))
+    return usable
 
 @router.post("/top-matches")
 async def get_top_matching_resumes(jd_text: str = Form(...)):
     try:
-        resumes = list(resume_collection.find({}, {
-            "resumeUrl": 1,
-            "email": 1,
-            "driveUrl": 1,   # <-- Include this
-            "_id": 1
-        }))
+        # Stream resumes page by page: each page's PDF fetch + parse starts
+        # while the next page is still being read from MongoDB
+        queue = asyncio.Queue(maxsize=MAX_PENDING_PAGES)
+        producer = asyncio.create_task(_produce_resume_pages(queue))
+        resumes = []
+        prefetches = []
+        found_any = False
+        try:
+            while (page := await queue.get()) is not None:
+                found_any = True
+                page = _usable_resumes(page)
+                resumes.extend(page)
+                prefetches.append(asyncio.create_task(
+                    _prefetch_resume_texts([resume["resumeUrl"] for resume in page])
+                ))
+            await producer  # re-raise any cursor error
+
+            resume_texts = {}
+            for texts in await asyncio.gather(*prefetches):
+                resume_texts.update(texts)
+        finally:
+            # On failure, don't leave the producer blocked on the full queue
+            # (holding its cursor) or prefetches running unawaited
+            producer.cancel()
+            for task in prefetches:
+                task.cancel()
+            await asyncio.gather(producer, *prefetches, return_exceptions=True)
         
-        if not resumes:
+        if not found_any:
             raise HTTPException(status_code=404, detail="No resumes available in database.")
 
-        logger.info(f"🔍 Analyzing {len(resumes)} resumes against JD...")
+        logger.info("🔍 Analyzing %s resumes against JD...", len(resumes))
+
+        resume_urls = [resume["resumeUrl"] for resume in resumes]
 
-        # Process all resumes in parallel using asyncio.gather
-        # This allows FastAPI to handle other requests while ML work runs in threads
-        tasks = [analyze_single_resume(resume, jd_text) for resume in resumes]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        # Embeddings stored at upload time: those resumes skip the BERT encode
+        stored_embeddings = {
+            resume["resumeUrl"]: bytes(resume["embedding"])
+            for resume in resumes
+            if resume.get("embedding") and resume.get("embeddingModel") == EMBEDDING_MODEL_TAG
+        }
+
+        # Score every resume in one ML job (runs in thread pool, non-blocking):
+        # one batched BERT encode, vectorized similarity
+        scores = await execute_ml_work(
+            score_resumes_against_jd,
+            resume_urls,
+            jd_text,
+            resume_texts,
+            stored_embeddings
+        )
 
-        # Filter out None results (failed analyses) and exceptions
+        # Drop resumes that failed to download/parse
         valid_results = []
-        for result in results:
-            if result and not isinstance(result, Exception):
-                valid_results.append(result)
+        for resume, score in zip(resumes, scores):
+            if score is None:
+                logger.error("⚠️ Error analyzing resume %s", resume.get('_id'))
+                continue
+            valid_results.append({
+                "resumeId": str(resume["_id"]),
+                "email": resume["email"],
+                "resumeUrl": resume["resumeUrl"],
+                "driveUrl": resume.get("driveUrl", ""),
+                "matchedSkills": score["matchedSkills"],
+                "scores": {
+                    "skillScore": score["skillScore"],
+                    "tfidfScore": score["tfidfScore"],
+                    "bertScore": score["bertScore"],
+                    "hybridScore": score["hybridScore"]
+                }
+            })
 
         # Group by email and keep best resume per email
         email_to_best_resume = {}
@@ -83,7 +165,7 @@ async def get_top_matching_resumes(jd_text: str = Form(...)):
             reverse=True
         )[:10]
 
-        logger.info(f"✅ Found {len(top_resumes)} top matching resumes")
+        logger.info("✅ Found %s top matching resumes", len(top_resumes))
 
         return {
             "message": "Top matching resumes retrieved",
@@ -93,5 +175,5 @@ async def get_top_matching_resumes(jd_text: str = Form(...)):
         }
 
     except Exception as e:
-        logger.error(f"❌ Error matching resumes: {str(e)}", exc_info=True)
+        logger.error("❌ Error matching resumes: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error matching resumes: {str(e)}")
@@ -5,7 +5,9 @@ from getData import router as data_router
 from hr_matches import router as hr_router
 from uploads import router as resume_router
 from market_analysis.router import router as market_router
-from ml_executor import shutdown_executor
+from ml_executor import shutdown_executor, execute_ml_work
+from pdf_fetcher import close_http_client
+from market_analysis.llm_reporter import close_groq_client
 from logging_config import setup_logging
 import os
 from dotenv import load_dotenv
@@ -39,9 +41,16 @@ async def startup_event():
         _db_singleton.client.admin.command('ping')
         logger.info("✅ Database connection initialized and tested")
     except Exception as e:
-        logger.error(f"❌ Database initialization failed: {e}")
+        logger.error("❌ Database initialization failed: %s", e)
     
-    logger.info("✅ ML ThreadPoolExecutor ready")
+    try:
+        # First real request shouldn't pay the model's lazy initialization
+        from calculation import warm_up_models
+        await execute_ml_work(warm_up_models)
+    except Exception as e:
+        logger.error("❌ Model warmup failed: %s", e)
+    
+    logger.info("✅ ML worker pools ready")
     logger.info("✅ Application startup complete")
 
 @app.on_event("shutdown")
@@ -50,11 +59,16 @@ async def shutdown_event():
     logger.info("🛑 Shutting down application...")
     try:
         shutdown_executor()
+        await close_http_client()
+        await close_groq_client()
+        from calculation import ENCODER
+        if ENCODER:
+            ENCODER.close()
         from database import _db_singleton
         _db_singleton.close()
         logger.info("✅ Shutdown complete")
     except Exception as e:
-        logger.error(f"Error during shutdown: {e}")
+        logger.error("Error during shutdown: %s", e)
 
 @app.get("/")
 async def root():
@@ -68,7 +82,7 @@ async def health_check():
         _db_singleton.client.admin.command('ping')
         db_status = "connected"
     except Exception as e:
-        logger.error(f"Health check failed: {e}")
+        logger.error("Health check failed: %s", e)
         db_status = "disconnected"
     
     return {
@@ -0,0 +1,30 @@
+"""
+Shared SentenceTransformer instances
+Each model is loaded once per process, no matter how many stores/retrievers use it
+"""
+
+import functools
+import threading
+
+import torch
+from sentence_transformers import SentenceTransformer
+
+_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=4)
+def _load(model_name: str) -> SentenceTransformer:
+    print(f"🧠 Loading embedding model: {model_name}")
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    model = SentenceTransformer(model_name, device=device)
+    if device == "cuda":
+        # Half precision on GPU: normalized cosine scores are unaffected in practice
+        model.half()
+    return model
+
+
+def get_encoder(model_name: str) -> SentenceTransformer:
+    """Process-wide encoder for model_name (fp16 on GPU), loaded on first use"""
+    # The lock keeps concurrent first calls from loading the model twice
+    with _lock:
+        return _load(model_name)
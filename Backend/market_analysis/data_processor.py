@@ -3,14 +3,72 @@ Data Processing Pipeline for Job Market Analysis
 Cleans, chunks, and prepares data for RAG storage
 """
 
+import os
 import re
-from typing import List, Dict
-from bs4 import BeautifulSoup
+import html
+import heapq
+import multiprocessing
+import ahocorasick
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Tuple
+from lxml import html as lxml_html
+from lxml import etree
+from lxml.etree import ParserError
 from collections import Counter
+from operator import itemgetter
+
+# Compiled once; clean_text runs for every scraped description
+_URL_RE = re.compile(r'http\S+|www\S+')
+_PUNCT_RE = re.compile(r'[^\w\s.,!?-]')
+_WS_RE = re.compile(r'\s+')
+_WORD_RE = re.compile(r'\S+')
+# A tag or an entity; text without either never needs the HTML parser
+_MARKUP_RE = re.compile(r'<[^>]+>|&(?:#\d+|#x[0-9a-fA-F]+|\w+);')
+# Closing tags that would make the parser drop any text after them
+_DOC_END_RE = re.compile(r'</(?:html|body)\s*>', re.IGNORECASE)
+# Fallback when lxml can't take the text: drop script/style bodies, then tags
+_SCRIPT_STYLE_RE = re.compile(r'<(script|style)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+_TAG_RE = re.compile(r'<[^>]+>')
+
+# Common tech skills to look for in extract_skill_patterns
+TECH_KEYWORDS = (
+    "python", "java", "javascript", "react", "node.js",
+    "aws", "docker", "kubernetes", "mongodb", "postgresql",
+    "machine learning", "llm", "rag", "api", "rest"
+)
+
+# One automaton over all keywords; values carry the keyword's list position
+# so matches can be reported in TECH_KEYWORDS order
+_TECH_AUTOMATON = ahocorasick.Automaton()
+for _pos, _kw in enumerate(TECH_KEYWORDS):
+    _TECH_AUTOMATON.add_word(_kw, (_pos, _kw))
+_TECH_AUTOMATON.make_automaton()
+
+def find_tech_keywords(text_lower: str) -> List[str]:
+    """Keywords occurring (as substrings) in already lowercased text, in one linear scan"""
+    found = {value for _, value in _TECH_AUTOMATON.iter(text_lower)}
+    return [kw for _, kw in sorted(found)]
+
+# Cleaning is CPU-bound and per-job independent; below this many jobs the
+# process start-up cost outweighs the parallel speedup
+PARALLEL_MIN_JOBS = 64
+MARKET_WORKERS = int(os.getenv("MARKET_WORKERS", os.cpu_count() or 1))
+
+def _process_one_job(args: Tuple[str, Dict, int, bool]) -> Tuple[Dict, List[Dict], List[str]]:
+    """Clean + chunk one job description (module-level so worker processes can pickle it)"""
+    skill, job, chunk_size, cache_lower = args
+    processor = JobDataProcessor(chunk_size=chunk_size, cache_lower=cache_lower)
+    return processor.process_job(skill, job)
 
 class JobDataProcessor:
-    def __init__(self, chunk_size: int = 500):
+    def __init__(self, chunk_size: int = 500, cache_lower: bool = False):
+        """
+        cache_lower: also keep each chunk's lowercased text as "text_lower", for
+        callers that rescan chunks (extract_skill_patterns). Doubles chunk text
+        memory; process_scraped_data's own keyword scan doesn't need it.
+        """
         self.chunk_size = chunk_size
+        self.cache_lower = cache_lower
     
     def process_scraped_data(self, scraped_results: List[Dict]) -> Dict:
         """
@@ -22,81 +80,143 @@ class JobDataProcessor:
         Returns:
             {
                 "processed_jobs": [...],
-                "all_chunks": [...],
+                "chunk_columns": {"text": [...], "skill": [...], "title": [...],
+                                  "chunk_index": [...], "word_count": [...]},
                 "skill_frequency": {...},
+                "skill_patterns": {...},
                 "statistics": {...}
             }
         """
         print("🔧 Processing scraped job data...")
         
         all_jobs = []
-        all_chunks = []
         skill_counter = Counter()
         
+        # Chunks are stored column-wise (one list per field, row i = chunk i)
+        # rather than as millions of identically shaped dicts
+        columns = ("text", "skill", "title", "chunk_index", "word_count")
+        if self.cache_lower:
+            columns += ("text_lower",)
+        chunk_columns: Dict[str, List] = {name: [] for name in columns}
+        texts = chunk_columns["text"]
+        skills = chunk_columns["skill"]
+        titles = chunk_columns["title"]
+        chunk_indices = chunk_columns["chunk_index"]
+        word_counts = chunk_columns["word_count"]
+        
+        work = []
         for result in scraped_results:
             skill = result["skill"]
-            job_descriptions = result.get("job_descriptions", [])
-            
-            for job in job_descriptions:
-                # Clean description
-                clean_desc = self.clean_text(job["description"])
-                
-                # Create chunks
-                chunks = self.chunk_text(clean_desc, job["title"], skill)
-                all_chunks.extend(chunks)
-                
-                # Process job
-                processed_job = {
-                    "skill": skill,
-                    "title": job["title"],
-                    "company": job["company"],
-                    "clean_description": clean_desc,
-                    "word_count": len(clean_desc.split()),
-                    "chunks": len(chunks)
-                }
-                all_jobs.append(processed_job)
+            for job in result.get("job_descriptions", []):
+                work.append((skill, job, self.chunk_size, self.cache_lower))
             
             # Count skill frequency
             for related_skill in result.get("related_skills", []):
                 skill_counter[related_skill] += 1
         
+        # Clean + chunk every job, across processes when there are enough of them
+        if len(work) >= PARALLEL_MIN_JOBS and MARKET_WORKERS > 1:
+            with ProcessPoolExecutor(max_workers=MARKET_WORKERS,
+                                     mp_context=multiprocessing.get_context("spawn")) as ex:
+                outputs = list(ex.map(_process_one_job, work, chunksize=32))
+        else:
+            outputs = [_process_one_job(item) for item in work]
+        
+        # Keyword co-occurrence per skill, from the scan done while chunking
+        pattern_counters: Dict[str, Counter] = {}
+        for processed_job, chunks, keyword_hits in outputs:
+            all_jobs.append(processed_job)
+            for chunk in chunks:
+                meta = chunk["metadata"]
+                texts.append(chunk["text"])
+                skills.append(meta["skill"])
+                titles.append(meta["title"])
+                chunk_indices.append(meta["chunk_index"])
+                word_counts.append(meta["word_count"])
+                if self.cache_lower:
+                    chunk_columns["text_lower"].append(chunk["text_lower"])
+            skill = processed_job["skill"]
+            if chunks:
+                pattern_counters.setdefault(skill, Counter()).update(keyword_hits)
+        skill_patterns = {skill: counter.most_common(5) for skill, counter in pattern_counters.items()}
+        
         # Statistics
         stats = {
             "total_jobs_processed": len(all_jobs),
-            "total_chunks_created": len(all_chunks),
-            "avg_chunks_per_job": len(all_chunks) / len(all_jobs) if all_jobs else 0,
+            "total_chunks_created": len(texts),
+            "avg_chunks_per_job": len(texts) / len(all_jobs) if all_jobs else 0,
             "unique_skills_found": len(skill_counter),
             "most_common_skills": skill_counter.most_common(10)
         }
         
-        print(f"✅ Processed {len(all_jobs)} jobs into {len(all_chunks)} chunks")
+        print(f"✅ Processed {len(all_jobs)} jobs into {len(texts)} chunks")
         print(f"📊 Found {len(skill_counter)} unique skills")
         
         return {
             "processed_jobs": all_jobs,
-            "all_chunks": all_chunks,
+            "chunk_columns": chunk_columns,
             "skill_frequency": dict(skill_counter),
+            "skill_patterns": skill_patterns,
             "statistics": stats
         }
     
+    def process_job(self, skill: str, job: Dict) -> Tuple[Dict, List[Dict], List[str]]:
+        """
+        Clean and chunk a single job description
+        Returns (processed_job, chunks, tech keywords found per chunk)
+        """
+        # Clean description
+        clean_desc = self.clean_text(job["description"])
+        
+        # Create chunks, scanning each for tech keywords while it is fresh
+        chunks = self.chunk_text(clean_desc, job["title"], skill)
+        keyword_hits = []
+        for chunk in chunks:
+            keyword_hits.extend(find_tech_keywords(chunk.get("text_lower") or chunk["text"].lower()))
+        
+        # Process job
+        processed_job = {
+            "skill": skill,
+            "title": job["title"],
+            "company": job["company"],
+            "clean_description": clean_desc,
+            "word_count": len(clean_desc.split()),
+            "chunks": len(chunks)
+        }
+        return processed_job, chunks, keyword_hits
+    
     def clean_text(self, text: str) -> str:
         """
         Clean HTML and formatting from text
         """
-        # Remove HTML tags
-        text = BeautifulSoup(text, "html.parser").get_text()
+        # Remove HTML tags (and decode entities); plain text skips the parser,
+        # including text that merely contains "<" or "&" (e.g. "R&D")
+        if _MARKUP_RE.search(text):
+            text = self._html_to_text(text)
         
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text)
+        # Remove URLs first, while they are still whole tokens
+        text = _URL_RE.sub('', text)
         
         # Remove special characters (keep basic punctuation)
-        text = re.sub(r'[^\w\s.,!?-]', '', text)
+        text = _PUNCT_RE.sub('', text)
         
-        # Remove URLs
-        text = re.sub(r'http\S+|www\S+', '', text)
+        # Remove extra whitespace
+        text = _WS_RE.sub(' ', text)
         
         return text.strip()
     
+    @staticmethod
+    def _html_to_text(text: str) -> str:
+        """Visible text of an HTML description, as BeautifulSoup's get_text() gave it"""
+        try:
+            doc = lxml_html.document_fromstring(_DOC_END_RE.sub('', text))
+        except (ParserError, ValueError):
+            # Nothing parseable (whitespace only), or an <?xml encoding=...?>
+            # declaration lxml refuses on str input
+            return html.unescape(_TAG_RE.sub('', _SCRIPT_STYLE_RE.sub('', text)))
+        etree.strip_elements(doc, "script", "style", with_tail=False)
+        return doc.text_content()
+    
     def chunk_text(self, text: str, title: str, skill: str) -> List[Dict]:
         """
         Split text into chunks for RAG storage
@@ -106,23 +226,35 @@ class JobDataProcessor:
             return []
         
         chunks = []
-        words = text.split()
+        
+        # Character offsets of every word; each chunk is then one slice of
+        # the original string instead of a join over its words
+        starts = []
+        ends = []
+        for match in _WORD_RE.finditer(text):
+            starts.append(match.start())
+            ends.append(match.end())
+        n_words = len(starts)
         
         # Create overlapping chunks
-        for i in range(0, len(words), self.chunk_size - 50):  # 50 word overlap
-            chunk_words = words[i:i + self.chunk_size]
-            chunk_text = ' '.join(chunk_words)
+        chunk_index = 0
+        for i in range(0, n_words, self.chunk_size - 50):  # 50 word overlap
+            last = min(i + self.chunk_size, n_words) - 1
+            chunk_text = text[starts[i]:ends[last]]
             
-            chunks.append({
-                "cleaned_chunk": chunk_text,
+            chunk = {
                 "text": chunk_text,
                 "metadata": {
                     "skill": skill,
                     "title": title,
-                    "chunk_index": len(chunks),
-                    "word_count": len(chunk_words)
+                    "chunk_index": chunk_index,
+                    "word_count": last - i + 1
                 }
-            })
+            }
+            if self.cache_lower:
+                chunk["text_lower"] = chunk_text.lower()
+            chunks.append(chunk)
+            chunk_index += 1
         
         return chunks
     
@@ -130,21 +262,17 @@ class JobDataProcessor:
         """
         Identify common skill co-occurrence patterns
         E.g., "Python jobs often require AWS and Docker"
+        
+        process_scraped_data already returns this as "skill_patterns";
+        use this only for chunks that didn't come from it.
         """
         skill_patterns = {}
         
         for chunk in all_chunks:
             skill = chunk["metadata"]["skill"]
-            text_lower = chunk["text"].lower()
-            
-            # Common tech skills to look for
-            tech_keywords = [
-                "python", "java", "javascript", "react", "node.js",
-                "aws", "docker", "kubernetes", "mongodb", "postgresql",
-                "machine learning", "llm", "rag", "api", "rest"
-            ]
+            text_lower = chunk.get("text_lower") or chunk["text"].lower()
             
-            found_skills = [kw for kw in tech_keywords if kw in text_lower]
+            found_skills = find_tech_keywords(text_lower)
             
             if skill not in skill_patterns:
                 skill_patterns[skill] = []
@@ -200,9 +328,11 @@ class JobDataProcessor:
         """
         Identify most frequently mentioned skills across all jobs
         """
-        sorted_skills = sorted(skill_frequency.items(), 
-                              key=lambda x: x[1], 
-                              reverse=True)[:top_n]
+        # Partial selection instead of sorting every skill to keep top_n
+        if top_n < len(skill_frequency) // 2:
+            sorted_skills = heapq.nlargest(top_n, skill_frequency.items(), key=itemgetter(1))
+        else:
+            sorted_skills = sorted(skill_frequency.items(), key=itemgetter(1), reverse=True)[:top_n]
         
         trending = []
         for skill, count in sorted_skills:
@@ -245,6 +375,18 @@ DOMAIN_MAPPING = {
     ]
 }
 
+# Inverted index: domain keyword -> [(domain, position in that domain's list)],
+# scanned with one automaton so each analyzed skill is read once
+_DOMAIN_KEYWORDS: Dict[str, List[Tuple[str, int]]] = {}
+for _domain, _domain_skills in DOMAIN_MAPPING.items():
+    for _pos, _ds in enumerate(_domain_skills):
+        _DOMAIN_KEYWORDS.setdefault(_ds, []).append((_domain, _pos))
+
+_DOMAIN_AUTOMATON = ahocorasick.Automaton()
+for _ds in _DOMAIN_KEYWORDS:
+    _DOMAIN_AUTOMATON.add_word(_ds, _ds)
+_DOMAIN_AUTOMATON.make_automaton()
+
 def group_skills_by_domain(scraped_results: List[Dict]) -> Dict:
     """
     Group analyzed skills into domains and calculate domain totals
@@ -252,25 +394,25 @@ def group_skills_by_domain(scraped_results: List[Dict]) -> Dict:
     domain_jobs = {}
     skill_to_jobs = {r["skill"].lower(): r["total_jobs"] for r in scraped_results}
     
-    for domain, domain_skills in DOMAIN_MAPPING.items():
-        total_jobs = 0
-        matched_skills = []
-        
-        for domain_skill in domain_skills:
-            for analyzed_skill, job_count in skill_to_jobs.items():
-                if domain_skill in analyzed_skill.lower():
-                    total_jobs += job_count
-                    matched_skills.append({
-                        "skill": analyzed_skill,
-                        "jobs": job_count
-                    })
+    # One scan per analyzed skill finds every domain keyword it contains;
+    # entries keep (keyword position, skill position) to restore list order
+    domain_hits: Dict[str, List[Tuple[int, int, str, int]]] = {}
+    for skill_pos, (analyzed_skill, job_count) in enumerate(skill_to_jobs.items()):
+        found = {kw for _, kw in _DOMAIN_AUTOMATON.iter(analyzed_skill)}
+        for domain_skill in found:
+            for domain, kw_pos in _DOMAIN_KEYWORDS[domain_skill]:
+                domain_hits.setdefault(domain, []).append((kw_pos, skill_pos, analyzed_skill, job_count))
+    
+    for domain in DOMAIN_MAPPING:
+        hits = sorted(domain_hits.get(domain, []))
+        total_jobs = sum(job_count for _, _, _, job_count in hits)
+        matched_skills = [{"skill": skill, "jobs": job_count} for _, _, skill, job_count in hits]
         
         if matched_skills:
             domain_jobs[domain] = {
                 "total_jobs": total_jobs,
-                "matched_skills": sorted(matched_skills, 
-                                        key=lambda x: x["jobs"], 
-                                        reverse=True)[:5],  # Top 5 skills
+                "matched_skills": heapq.nlargest(5, matched_skills,
+                                                 key=itemgetter("jobs")),  # Top 5 skills
                 "skill_count": len(matched_skills)
             }
     
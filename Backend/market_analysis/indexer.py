@@ -3,27 +3,80 @@
 Builds FAISS index from processed job chunks.
 - Loads the processed pickle file from ingest.py
 - Embeds chunks using SentenceTransformer (mpnet)
-- Saves FAISS index + metadata mapping
+- Saves FAISS index + columnar metadata (row i describes FAISS id i)
 """
 
 import os
 import pickle
 import faiss
 import numpy as np
+import torch
 from pathlib import Path
 from typing import Dict, List
 
 from sentence_transformers import SentenceTransformer
 
+from ._encoder import get_encoder
+
 DATA_DIR = Path(os.getenv("MARKET_DATA_DIR", "./market_analysis/market_data"))
 DATA_DIR.mkdir(exist_ok=True, parents=True)
 
 EMBED_MODEL = os.getenv("EMBED_MODEL", "sentence-transformers/all-mpnet-base-v2")
 
+# Chunks per forward pass; SentenceTransformer sorts by length inside encode()
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))
+
+# Exact search below this many chunks; HNSW graph above it
+HNSW_MIN_CHUNKS = int(os.getenv("HNSW_MIN_CHUNKS", "5000"))
+HNSW_M = 32
+
 INDEX_PATH = DATA_DIR / "faiss_index.bin"
 META_PATH = DATA_DIR / "faiss_metadata.pkl"
 
 
+def get_embed_model() -> SentenceTransformer:
+    """The shared EMBED_MODEL encoder used by index builds and the retriever"""
+    return get_encoder(EMBED_MODEL)
+
+
+def read_index_mmap(path: str):
+    """
+    Read a FAISS index memory-mapped, so worker processes share its pages
+    (falls back to a normal read for index types that can't be mapped)
+    """
+    try:
+        return faiss.read_index(path, faiss.IO_FLAG_MMAP)
+    except Exception:
+        return faiss.read_index(path)
+
+
+def chunks_to_columns(chunks: List[Dict]) -> Dict[str, List]:
+    """
+    Chunk dicts (older processed pickles / metadata files) -> one list per field,
+    the same layout JobDataProcessor now emits as "chunk_columns"
+    """
+    return {
+        # Older chunks may only carry the text under "cleaned_chunk"
+        "text": [c["text"] if "text" in c else c["cleaned_chunk"] for c in chunks],
+        "skill": [c["metadata"]["skill"] for c in chunks],
+        "title": [c["metadata"]["title"] for c in chunks],
+        "chunk_index": [c["metadata"]["chunk_index"] for c in chunks],
+    }
+
+
+def metadata_columns(columns: Dict[str, List]) -> Dict:
+    """
+    Chunk columns -> the compact metadata saved next to the index
+    Row i describes FAISS id i
+    """
+    return {
+        "text": columns["text"],
+        "skill": np.array(columns["skill"], dtype=object),
+        "title": np.array(columns["title"], dtype=object),
+        "chunk_index": np.array(columns["chunk_index"], dtype=np.int32),
+    }
+
+
 def build_faiss_index(processed_pickle_path: str,
                        index_save_path: str = str(INDEX_PATH),
                        metadata_save_path: str = str(META_PATH)):
@@ -34,53 +87,69 @@ def build_faiss_index(processed_pickle_path: str,
     with open(processed_pickle_path, "rb") as f:
         processed = pickle.load(f)
 
-    chunks = processed["all_chunks"]
-    if not chunks:
+    # Pickles from before the columnar output hold a list of chunk dicts
+    if "chunk_columns" in processed:
+        columns = processed["chunk_columns"]
+    else:
+        columns = chunks_to_columns(processed["all_chunks"])
+
+    texts = columns["text"]
+    n_chunks = len(texts)
+    if not n_chunks:
         raise ValueError("No chunks found to index.")
 
-    print(f"📦 Loaded {len(chunks)} chunks")
+    print(f"📦 Loaded {n_chunks} chunks")
 
     # Load embedding model
-    print("🔢 Loading embedding model:", EMBED_MODEL)
-    model = SentenceTransformer(EMBED_MODEL)
-
-    # Compute embeddings in batches
-    BATCH = 64
-    all_embeddings = []
-
-    print("⚙️ Generating embeddings...")
-    for i in range(0, len(chunks), BATCH):
-        batch = [c["cleaned_chunk"] for c in chunks[i:i+BATCH]]
-        emb = model.encode(batch, normalize_embeddings=True)
-        all_embeddings.append(emb)
-
-    embeddings = np.vstack(all_embeddings).astype("float32")
-    print(f"🧠 Embeddings shape: {embeddings.shape}")
+    model = get_embed_model()
 
     # Build FAISS index (cosine similarity → using inner product)
-    dim = embeddings.shape[1]
-    index = faiss.IndexIDMap(faiss.IndexFlatIP(dim))
-
-    print("📥 Adding embeddings to FAISS index...")
-    ids = np.arange(len(embeddings)).astype("int64")
-    index.add_with_ids(embeddings, ids)
+    dim = model.get_sentence_embedding_dimension()
+    if n_chunks >= HNSW_MIN_CHUNKS:
+        print(f"🕸️ Using HNSW index for {n_chunks} chunks")
+        base = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        base.hnsw.efConstruction = 200
+        base.hnsw.efSearch = 64  # persisted with the index
+    else:
+        base = faiss.IndexFlatIP(dim)
+    index = faiss.IndexIDMap(base)
+
+    # Each batch goes into the index as soon as it is encoded, so only one
+    # batch of embeddings is held outside FAISS at a time
+    print("⚙️ Generating embeddings and adding them to FAISS index...")
+    with torch.inference_mode():
+        for i in range(0, n_chunks, EMBED_BATCH_SIZE):
+            batch = texts[i:i + EMBED_BATCH_SIZE]
+            emb = model.encode(
+                batch,
+                batch_size=EMBED_BATCH_SIZE,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False
+            )
+            # FAISS wants float32 whatever precision the model ran in
+            index.add_with_ids(
+                np.ascontiguousarray(emb, dtype=np.float32),
+                np.arange(i, i + len(batch), dtype=np.int64)
+            )
+    print(f"🧠 Indexed {index.ntotal} embeddings of dim {dim}")
 
     # Save index
     print("💾 Saving FAISS index to:", index_save_path)
     faiss.write_index(index, index_save_path)
 
-    # Save metadata (mapping ID → chunk info)
+    # Save metadata as parallel columns indexed by FAISS id
     print("💾 Saving metadata to:", metadata_save_path)
-    metadata = {i: chunks[i] for i in range(len(chunks))}
+    metadata = metadata_columns(columns)
 
     with open(metadata_save_path, "wb") as f:
-        pickle.dump(metadata, f)
+        pickle.dump(metadata, f, protocol=pickle.HIGHEST_PROTOCOL)
 
     print("🎉 Index build complete!")
     return {
         "index_path": index_save_path,
         "metadata_path": metadata_save_path,
-        "total_chunks": len(chunks)
+        "total_chunks": n_chunks
     }
 
 
@@ -11,8 +11,9 @@ import os
 import time
 import hashlib
 import pickle
-from typing import List, Dict, Set
+from typing import List, Dict, Set, Optional
 from pathlib import Path
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 from dotenv import load_dotenv
 
 
@@ -37,10 +38,36 @@ scraper = JobScraper(api_key=SERPAPI_KEY)
 processor = JobDataProcessor(chunk_size=int(os.getenv("CHUNK_SIZE", 500)))
 
 
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = ("utm_", "gclid", "fbclid")
+
+
+def normalize_url(url: str) -> str:
+    """Lowercase scheme/host, drop tracking params and fragment"""
+    parts = urlsplit(url.strip())
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if not k.lower().startswith(TRACKING_PARAMS)]
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, urlencode(query), ""))
+
+
 # Helper - compute stable hash for a job
-def job_hash(title: str, company: str, snippet: str) -> str:
-    s = f"{(title or '').strip()}||{(company or '').strip()}||{(snippet or '').strip()}"
-    return hashlib.sha256(s.encode("utf-8")).hexdigest()
+# Only needed for equality, so a 64-bit BLAKE2b digest kept as an int is plenty
+def job_hash(title: str, company: str, snippet: str, url: Optional[str] = None) -> int:
+    """
+    Identify a listing by its job id / URL when the scraper provides one,
+    so the same posting with an edited description still dedupes;
+    otherwise by title + company + start of the description.
+    """
+    h = hashlib.blake2b(digest_size=8)
+    if url:
+        h.update(url.encode("utf-8"))
+        return int.from_bytes(h.digest(), "little")
+    h.update((title or '').strip().encode("utf-8"))
+    h.update(b"||")
+    h.update((company or '').strip().encode("utf-8"))
+    h.update(b"||")
+    h.update((snippet or '').strip().encode("utf-8"))
+    return int.from_bytes(h.digest(), "little")
 
 
 def dedupe_scraped_results(scraped_results: List[Dict]) -> List[Dict]:
@@ -48,7 +75,7 @@ def dedupe_scraped_results(scraped_results: List[Dict]) -> List[Dict]:
     Deduplicate across skills and within each skill's jobs.
     Returns a new list of scraped_results with job_descriptions deduped.
     """
-    seen: Set[str] = set()
+    seen: Set[int] = set()
     deduped_results = []
 
     for res in scraped_results:
@@ -57,10 +84,14 @@ def dedupe_scraped_results(scraped_results: List[Dict]) -> List[Dict]:
         kept_jobs = []
 
         for job in job_descriptions:
-            title = job.get("title", "")
-            company = job.get("company", "")
-            snippet = job.get("description", "")[:300]  # first 300 chars
-            h = job_hash(title, company, snippet)
+            if job.get("job_id"):
+                url = f"job_id:{job['job_id']}"
+            elif job.get("url"):
+                url = normalize_url(job["url"])
+            else:
+                url = None
+            snippet = "" if url else job.get("description", "")[:120]  # first 120 chars
+            h = job_hash(job.get("title", ""), job.get("company", ""), snippet, url)
             if h not in seen:
                 seen.add(h)
                 kept_jobs.append(job)
@@ -110,7 +141,7 @@ def run_ingest(skills: List[str],
         ts = int(time.time())
         out_path = DATA_DIR / f"processed_jobs_{ts}.pkl"
         with open(out_path, "wb") as f:
-            pickle.dump(processed, f)
+            pickle.dump(processed, f, protocol=pickle.HIGHEST_PROTOCOL)
         result["saved_to"] = str(out_path)
         print(f"💾 Processed data saved to {out_path}")
 
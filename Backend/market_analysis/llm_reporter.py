@@ -12,10 +12,12 @@ NOTE: This file does NOT embed any secret keys. Provide them via env variables.
 
 import os
 import textwrap
+import functools
 from typing import Dict, Any, List
 
 # optional HTTP client for calling an LLM API if configured
-import requests
+import httpx
+import orjson
 
 from dotenv import load_dotenv
 import os
@@ -29,23 +31,33 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 LLM_PROVIDER = os.getenv("LLM_PROVIDER", "groq")  # options: "groq", "openai", "none"
 
-def _build_prompt(context: Dict[str, Any]) -> str:
-    """
-    Build a concise LLM prompt from the context (hits).
-    """
-    q = context.get("query", "")
-    hits = context.get("hits", [])
-    summary_docs = []
-    for i, h in enumerate(hits):
-        title = h.get("source_job_title") or h.get("skill") or "Unknown title"
-        comp = h.get("source_company") or ""
-        score = h.get("score", 0)
-        text_snippet = (h.get("chunk_text") or "")[:700]
-        summary_docs.append(f"{i+1}. [{title} @ {comp}] (score: {score:.3f})\n{text_snippet}")
-
-    docs_block = "\n\n".join(summary_docs)
-    prompt = f"""
-You are a job market analyst. Given the query: "{q}", and the following job snippets, produce:
+GROQ_URL = "https://api.groq.com/openai/v1/chat/completions"
+
+# Shared pooled client: reports reuse one HTTP/2 connection instead of a
+# fresh TCP + TLS handshake per call
+_client = None
+
+def get_groq_client() -> httpx.AsyncClient:
+    """Lazily create the shared AsyncClient (must be called inside the event loop)"""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            http2=True,
+            timeout=30.0,
+            limits=httpx.Limits(max_connections=64)
+        )
+    return _client
+
+async def close_groq_client():
+    """Close the shared client on application shutdown"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+# Dedented once at import; filled with str.format per prompt
+_PROMPT_TEMPLATE = textwrap.dedent("""
+You are a job market analyst. Given the query: "{query}", and the following job snippets, produce:
 1) A short demand summary (HIGH / MEDIUM / LOW + bullet justification)
 2) Top 5 related skills appearing in these snippets
 3) One suggested missing high-value skill to learn (and why)
@@ -55,8 +67,37 @@ Documents:
 {docs_block}
 
 Answer succinctly in JSON with fields: demand_level, demand_reason, top_skills, missing_skill, salary_insights, recommendations.
-"""
-    return textwrap.dedent(prompt).strip()
+""").strip()
+
+
+@functools.lru_cache(maxsize=512)
+def _build_prompt_cached(query: str, hit_key: tuple) -> str:
+    """Prompt for a query + hit set; hit_key holds everything the prompt shows per hit"""
+    summary_docs = []
+    for i, (title, comp, score, text_snippet) in enumerate(hit_key):
+        summary_docs.append(f"{i+1}. [{title} @ {comp}] (score: {score:.3f})\n{text_snippet}")
+
+    docs_block = "\n\n".join(summary_docs)
+    return _PROMPT_TEMPLATE.format(query=query, docs_block=docs_block)
+
+
+def _build_prompt(context: Dict[str, Any]) -> str:
+    """
+    Build a concise LLM prompt from the context (hits).
+    Repeated query + hit sets (popular queries) reuse the cached prompt.
+    """
+    q = context.get("query", "")
+    hits = context.get("hits", [])
+    hit_key = tuple(
+        (
+            h.get("source_job_title") or h.get("skill") or "Unknown title",
+            h.get("source_company") or "",
+            h.get("score", 0),
+            (h.get("chunk_text") or "")[:700]
+        )
+        for h in hits
+    )
+    return _build_prompt_cached(q, hit_key)
 
 
 def _call_llm_stub(prompt: str) -> Dict[str, Any]:
@@ -87,7 +128,7 @@ def _call_llm_stub(prompt: str) -> Dict[str, Any]:
     }
 
 
-def _call_groq(prompt: str) -> Dict[str, Any]:
+async def _call_groq(prompt: str) -> Dict[str, Any]:
     """
     Calls Groq's chat completion API using llama3-70b.
     Returns the assistant-generated text as a dict.
@@ -96,7 +137,6 @@ def _call_groq(prompt: str) -> Dict[str, Any]:
     if not GROQ_API_KEY:
         raise RuntimeError("GROQ_API_KEY not set in environment")
 
-    url = "https://api.groq.com/openai/v1/chat/completions"
     headers = {
         "Authorization": f"Bearer {GROQ_API_KEY}",
         "Content-Type": "application/json"
@@ -112,15 +152,16 @@ def _call_groq(prompt: str) -> Dict[str, Any]:
         "max_tokens": 800
     }
 
-    resp = requests.post(url, json=payload, headers=headers, timeout=20)
+    # orjson encodes straight to bytes (Content-Type header is set above)
+    resp = await get_groq_client().post(GROQ_URL, content=orjson.dumps(payload), headers=headers)
     
     # ADD THIS: Print the error response
-    if not resp.ok:
+    if resp.is_error:
         print(f"Error Status: {resp.status_code}")
         print(f"Error Response: {resp.text}")
     
     resp.raise_for_status()
-    data = resp.json()
+    data = orjson.loads(resp.content)
 
     assistant_reply = data["choices"][0]["message"]["content"]
 
@@ -132,7 +173,7 @@ def _call_groq(prompt: str) -> Dict[str, Any]:
 
 
 
-def generate_report(context: Dict[str, Any], use_llm: bool = True) -> Dict[str, Any]:
+async def generate_report(context: Dict[str, Any], use_llm: bool = True) -> Dict[str, Any]:
     """
     Generates a report for the given context.
     If use_llm is True and LLM provider env is configured, try to call it.
@@ -142,7 +183,7 @@ def generate_report(context: Dict[str, Any], use_llm: bool = True) -> Dict[str,
 
     if use_llm and LLM_PROVIDER.lower() == "groq" and GROQ_API_KEY:
         try:
-            out = _call_groq(prompt)
+            out = await _call_groq(prompt)
             return {"provider": "groq", "result": out}
         except Exception as e:
             # fallback to stub
@@ -16,6 +16,7 @@ This file assumes the following modules exist in the same folder:
 
 import os
 import time
+import asyncio
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 
@@ -68,7 +69,14 @@ def index_from_existing_pkl(processed_pkl_path: str) -> Dict[str, Any]:
     return build_faiss_index(processed_pickle_path=processed_pkl_path)
 
 
-def query_and_report(query: str,
+def _retrieve(query: str, top_k: int,
+              index_path: Optional[str], metadata_path: Optional[str]) -> List[Dict]:
+    # Instantiate retriever (uses default DATA_DIR paths if not provided)
+    retr = MarketRetriever(index_path=index_path or None, metadata_path=metadata_path or None)
+    return retr.query(query, top_k=top_k)
+
+
+async def query_and_report(query: str,
                      top_k: int = 5,
                      use_llm: bool = True,
                      index_path: Optional[str] = None,
@@ -80,10 +88,8 @@ def query_and_report(query: str,
     """
     print(f"🔍 Querying for: {query} (top_k={top_k})")
 
-    # Instantiate retriever (uses default DATA_DIR paths if not provided)
-    retr = MarketRetriever(index_path=index_path or None, metadata_path=metadata_path or None)
-
-    hits = retr.query(query, top_k=top_k)
+    # Index load + embedding are blocking; keep them off the event loop
+    hits = await asyncio.to_thread(_retrieve, query, top_k, index_path, metadata_path)
     print(f"🔎 Retrieved {len(hits)} hits")
 
     # Build a context payload for the reporter
@@ -94,7 +100,7 @@ def query_and_report(query: str,
     }
 
     # Generate report via LLM reporter (or fallback)
-    report = generate_report(context, use_llm=use_llm)
+    report = await generate_report(context, use_llm=use_llm)
     return {
         "query": query,
         "hits": hits,
@@ -125,13 +131,13 @@ if __name__ == "__main__":
 
     # Step 2: run query + LLM report if query provided
     if args.query:
-        out = query_and_report(
+        out = asyncio.run(query_and_report(
             args.query,
             top_k=args.top_k,
             index_path=artifact_info["index_path"],
             metadata_path=artifact_info["metadata_path"],
             use_llm=True
-        )
+        ))
 
         print("\n==== REPORT ====\n")
         print(out["report"])
@@ -3,24 +3,103 @@ RAG Store using FAISS for Job Market Data
 Stores and retrieves job descriptions using semantic search
 """
 
+import os
+import json
+import shelve
+import hashlib
+import numbers
 import faiss
+import ahocorasick
 import numpy as np
 import pickle
-from typing import List, Dict
-from sentence_transformers import SentenceTransformer
+from collections import Counter
+from pathlib import Path
+from typing import List, Dict, Tuple
+from ._encoder import get_encoder
+from .indexer import read_index_mmap
+
+# Exact (fp16) search below this many chunks; HNSW graph above it
+HNSW_MIN_CHUNKS = int(os.getenv("HNSW_MIN_CHUNKS", "5000"))
+HNSW_M = 32
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))
+
+# Very large stores: IVF-PQ codes (48 bytes/vector instead of 1.5 KB)
+# Needs enough vectors to train the 256-centroid PQ codebooks and IVF lists
+IVFPQ_MIN_CHUNKS = int(os.getenv("IVFPQ_MIN_CHUNKS", "100000"))
+IVFPQ_M = 48
+IVFPQ_NPROBE = int(os.getenv("IVFPQ_NPROBE", "16"))
+
+# Recent queries + their results. Exact repeats are served without encoding;
+# free-form queries within this cosine of a cached one reuse its results too.
+# Templated skill queries are exact-only: "Java" vs "JavaScript" (or "React"
+# vs "React Native") land within the threshold once wrapped in the template
+QUERY_CACHE_SIZE = 1024
+QUERY_CACHE_THRESHOLD = float(os.getenv("RAG_QUERY_CACHE_THRESHOLD", "0.97"))
+
+# Encodes this large are sharded over a pool of worker processes
+# (one per GPU, or several on CPU); smaller ones aren't worth the IPC
+MULTI_PROCESS_MIN_TEXTS = 256
+
+# Chunk embeddings persisted across builds; overlapping scrapes skip the encoder
+EMB_CACHE_DIR = Path(os.getenv("RAG_EMB_CACHE_DIR", "./.rag_emb_cache"))
+
+# Common tech skills counted by find_related_skills
+TECH_SKILLS = (
+    "python", "java", "javascript", "typescript", "go", "rust",
+    "react", "angular", "vue", "node.js", "django", "flask", "fastapi",
+    "aws", "azure", "gcp", "docker", "kubernetes", "terraform",
+    "mongodb", "postgresql", "mysql", "redis",
+    "machine learning", "llm", "rag", "pytorch", "tensorflow"
+)
+
+# Skill counting only reads the start of each hit: job descriptions name
+# their stack up front, the rest is mostly benefits/boilerplate
+SKILL_SCAN_LIMIT = 1024
+
+# Metadata column types, with the placeholder stored where a row has no value.
+# Keys holding anything else (lists, dicts, mixed types) become object
+# columns, saved as JSON text since the npz is loaded without pickle
+_META_FILL = {str: "", bool: False, int: 0, float: 0.0, object: None}
+
+# Per-row state of a metadata value, saved for columns with gaps so rows
+# round-trip exactly: missing keys stay missing, None stays None
+_META_PRESENT, _META_NONE, _META_ABSENT = 0, 1, 2
+
+# Counts every skill in one pass over the text
+_SKILL_AUTOMATON = ahocorasick.Automaton()
+for _skill in TECH_SKILLS:
+    _SKILL_AUTOMATON.add_word(_skill, _skill)
+_SKILL_AUTOMATON.make_automaton()
+
+def _meta_kind(value):
+    """Typed column a metadata value fits in, object when none does"""
+    if isinstance(value, (bool, np.bool_)):
+        return bool
+    if isinstance(value, numbers.Integral):
+        return int
+    if isinstance(value, numbers.Real):
+        return float
+    if isinstance(value, str):
+        return str
+    return object
 
 class MarketRAGStore:
     def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
         """
         Initialize RAG store with BERT embeddings
         """
-        print(f"🧠 Loading embedding model: {model_name}")
-        self.model = SentenceTransformer(model_name)
+        self.model = get_encoder(model_name)
+        self.model_name = model_name
         self.index = None
         self.chunks = []
-        self.metadata = []
+        self.chunks_lower = []
+        self.metadata = {}  # column name -> NumPy array, row i = chunk i
+        self.metadata_state = {}  # column name -> per-row _META_* state, only for columns with gaps
         self.dimension = 384  # all-MiniLM-L6-v2 dimension
         
+        self._reset_query_cache()
+        self._pool = None  # multi-process encode pool, started on first large build
+        
         print("✅ RAG Store initialized")
     
     def build_index(self, chunks: List[Dict]):
@@ -42,20 +121,140 @@ class MarketRAGStore:
         # Extract texts
         texts = [chunk["text"] for chunk in chunks]
         self.chunks = texts
-        self.metadata = [chunk["metadata"] for chunk in chunks]
+        self.chunks_lower = [t.lower() for t in texts]  # lowercased once for skill counting
+        self.metadata, self.metadata_state = self._metadata_columns([chunk["metadata"] for chunk in chunks])
+        
+        # Create embeddings (unit length, so inner product = cosine similarity)
+        # Only texts not embedded by an earlier build go through the model.
+        # The shelf is opened just to read and then to write: dbm locks the
+        # file, so other stores on the same model can use it while we encode
+        embeddings = np.empty((len(texts), self.dimension), dtype=np.float32)
+        keys = [self._emb_key(t) for t in texts]
+        misses = []
+        with self._open_emb_cache() as emb_cache:
+            for i, key in enumerate(keys):
+                cached = emb_cache.get(key)
+                if cached is None:
+                    misses.append(i)
+                else:
+                    embeddings[i] = np.frombuffer(cached, dtype=np.float32)
         
-        # Create embeddings
-        print("🔄 Creating embeddings...")
-        embeddings = self.model.encode(texts, 
-                                       show_progress_bar=True,
-                                       convert_to_numpy=True)
+        print(f"🔄 Creating embeddings ({len(texts) - len(misses)} cached, {len(misses)} new)...")
+        if misses:
+            embeddings[misses] = self._encode_chunks([texts[i] for i in misses])
+            with self._open_emb_cache() as emb_cache:
+                for i in misses:
+                    emb_cache[keys[i]] = embeddings[i].tobytes()
         
         # Build FAISS index
-        self.index = faiss.IndexFlatL2(self.dimension)
-        self.index.add(embeddings.astype('float32'))
+        if len(texts) >= IVFPQ_MIN_CHUNKS:
+            nlist = min(4096, len(texts) // 39)
+            quantizer = faiss.IndexFlatIP(self.dimension)
+            self.index = faiss.IndexIVFPQ(quantizer, self.dimension, nlist, IVFPQ_M, 8,
+                                          faiss.METRIC_INNER_PRODUCT)
+            print(f"🎓 Training IVF-PQ index ({nlist} lists)...")
+            self.index.train(embeddings)
+        elif len(texts) >= HNSW_MIN_CHUNKS:
+            self.index = faiss.IndexHNSWFlat(self.dimension, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+            self.index.hnsw.efConstruction = 200
+        else:
+            # Exact scan over fp16-stored vectors: half the memory traffic of
+            # float32, with no training needed
+            self.index = faiss.IndexScalarQuantizer(self.dimension, faiss.ScalarQuantizer.QT_fp16,
+                                                    faiss.METRIC_INNER_PRODUCT)
+        self.index.add(embeddings)
+        self._reset_query_cache()
         
         print(f"✅ Index built successfully with {self.index.ntotal} vectors")
     
+    def _open_emb_cache(self) -> shelve.Shelf:
+        """The on-disk embedding cache for this model; use as a context manager"""
+        EMB_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        return shelve.open(str(EMB_CACHE_DIR / self.model_name.replace("/", "_")))
+    
+    def _encode_chunks(self, texts: List[str]) -> np.ndarray:
+        """Normalized float32 embeddings, sharded over worker processes for large builds"""
+        if len(texts) > MULTI_PROCESS_MIN_TEXTS and (os.cpu_count() or 1) > 1:
+            if self._pool is None:
+                self._pool = self.model.start_multi_process_pool()
+            embeddings = np.ascontiguousarray(
+                self.model.encode_multi_process(texts, self._pool, batch_size=64),
+                dtype=np.float32
+            )
+            faiss.normalize_L2(embeddings)
+            return embeddings
+        return self.model.encode(texts, 
+                                 batch_size=64,
+                                 show_progress_bar=True,
+                                 convert_to_numpy=True,
+                                 normalize_embeddings=True).astype('float32', copy=False)
+    
+    @staticmethod
+    def _metadata_columns(rows: List[Dict]) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+        """
+        Per-chunk metadata dicts -> (one NumPy array per key, per-row state
+        arrays for the keys some rows lack or hold None for)
+        A key holding one scalar type gets a typed column (ints mixed with
+        floats become float64); any other key an object column
+        """
+        keys = list(dict.fromkeys(k for row in rows for k in row))
+        columns, states = {}, {}
+        for key in keys:
+            state = np.array(
+                [_META_ABSENT if key not in row else _META_NONE if row[key] is None else _META_PRESENT
+                 for row in rows],
+                dtype=np.uint8
+            )
+            kinds = {_meta_kind(row[key]) for row, s in zip(rows, state) if s == _META_PRESENT}
+            if kinds == {int, float}:
+                kinds = {float}
+            kind = (kinds.pop() if len(kinds) == 1 else object) if kinds else str
+            fill = _META_FILL[kind]
+            values = [row[key] if s == _META_PRESENT else fill for row, s in zip(rows, state)]
+            if kind is object:
+                col = MarketRAGStore._object_column(values)
+            else:
+                col = np.array(values, dtype=np.int64 if kind is int else kind)
+            columns[key] = col
+            if state.any():
+                states[key] = state
+        return columns, states
+    
+    @staticmethod
+    def _object_column(values: List) -> np.ndarray:
+        # Element-wise, so list values aren't broadcast into extra dimensions
+        col = np.empty(len(values), dtype=object)
+        for i, value in enumerate(values):
+            col[i] = value
+        return col
+    
+    @staticmethod
+    def _saved_column(key: str, col: np.ndarray) -> Tuple[str, np.ndarray]:
+        """npz entry for a metadata column; object columns go in as JSON text"""
+        if col.dtype != object:
+            return f"meta_{key}", col
+        return f"json_{key}", np.array([json.dumps(v, default=str) for v in col], dtype=str)
+    
+    def _row_metadata(self, idx: int) -> Dict:
+        """Metadata dict for one chunk, as plain Python values"""
+        row = {}
+        for key, col in self.metadata.items():
+            state = self.metadata_state.get(key)
+            s = _META_PRESENT if state is None else state[idx]
+            if s == _META_PRESENT:
+                row[key] = col[idx] if col.dtype == object else col[idx].item()
+            elif s == _META_NONE:
+                row[key] = None
+        return row
+    
+    def _emb_key(self, text: str) -> str:
+        """Embedding cache key: hash of model name + chunk text"""
+        h = hashlib.blake2b(digest_size=16)
+        h.update(self.model_name.encode("utf-8"))
+        h.update(b"\0")
+        h.update(text.encode("utf-8"))
+        return h.hexdigest()
+    
     def query(self, query_text: str, top_k: int = 5) -> List[Dict]:
         """
         Query RAG store for relevant job descriptions
@@ -66,71 +265,130 @@ class MarketRAGStore:
         
         Returns:
             List of {
+                "chunk_id": 12,
                 "text": "job description",
                 "metadata": {...},
                 "score": 0.85
             }
         """
+        return self.query_many([query_text], top_k)[0]
+    
+    def query_many(self, query_texts: List[str], top_k: int = 5, semantic_cache: bool = True) -> List[List[Dict]]:
+        """
+        Query several texts at once: one batched encode and one FAISS search
+        Returns one result list (same shape as query) per query text
+        semantic_cache=False limits cache hits to exact repeats (templated queries)
+        """
+        if not query_texts:
+            return []
         if self.index is None or self.index.ntotal == 0:
             print("⚠️ Index is empty")
-            return []
+            return [[] for _ in query_texts]
+        k = min(top_k, self.index.ntotal)
+        
+        # Exact repeats answered with at least k results: no encode needed
+        all_results = [None] * len(query_texts)
+        for j, text in enumerate(query_texts):
+            cached = self._q_exact.get(text)
+            if cached is not None and cached[0] >= k:
+                all_results[j] = cached[1][:k]
+        
+        pending = [j for j, results in enumerate(all_results) if results is None]
+        if not pending:
+            return all_results
+        
+        # Create query embeddings
+        query_embeddings = self.model.encode([query_texts[j] for j in pending], 
+                                            batch_size=len(pending),
+                                            convert_to_numpy=True,
+                                            normalize_embeddings=True).astype('float32', copy=False)
         
-        # Create query embedding
-        query_embedding = self.model.encode([query_text], 
-                                           convert_to_numpy=True)
+        # Semantic cache: near-identical earlier free-form queries answered
+        # with at least k results are served from memory
+        n_cached = min(self._q_count, QUERY_CACHE_SIZE)
+        if semantic_cache and n_cached:
+            sims = query_embeddings @ self._q_embs[:n_cached].T
+            best = sims.argmax(axis=1)
+            for row, (j, slot) in enumerate(zip(pending, best)):
+                cached_k, cached_results = self._q_results[slot]
+                if sims[row, slot] > QUERY_CACHE_THRESHOLD and cached_k >= k:
+                    all_results[j] = cached_results[:k]
+            rows = [row for row, j in enumerate(pending) if all_results[j] is None]
+            pending = [pending[row] for row in rows]
+            query_embeddings = query_embeddings[rows]
+            if not pending:
+                return all_results
         
-        # Search
-        distances, indices = self.index.search(
-            query_embedding.astype('float32'), 
-            min(top_k, self.index.ntotal)
-        )
+        # Search (HNSW: how many graph candidates to explore per query;
+        # IVF: how many inverted lists to scan)
+        if isinstance(self.index, faiss.IndexHNSW):
+            self.index.hnsw.efSearch = max(HNSW_EF_SEARCH, top_k)
+        elif isinstance(self.index, faiss.IndexIVF):
+            self.index.nprobe = IVFPQ_NPROBE
+        scores, indices = self.index.search(query_embeddings, k)
         
-        # Format results
-        results = []
-        for i, idx in enumerate(indices[0]):
-            if idx < len(self.chunks):  # Valid index
-                results.append({
+        # Format results (one tolist() per array instead of int()/float() per hit)
+        n_chunks = len(self.chunks)
+        for row, (j, row_scores, row_indices) in enumerate(zip(pending, scores.tolist(), indices.tolist())):
+            results = [
+                {
+                    "chunk_id": idx,
                     "text": self.chunks[idx],
-                    "metadata": self.metadata[idx],
-                    "score": float(1 / (1 + distances[0][i]))  # Convert distance to similarity
-                })
+                    "metadata": self._row_metadata(idx),
+                    "score": score  # Cosine similarity
+                }
+                for idx, score in zip(row_indices, row_scores)
+                if 0 <= idx < n_chunks  # Valid index (-1 = no hit)
+            ]
+            all_results[j] = results
+            
+            # Remember it, dropping the oldest entries once the caches are full
+            self._q_exact[query_texts[j]] = (k, results)
+            if len(self._q_exact) > QUERY_CACHE_SIZE:
+                del self._q_exact[next(iter(self._q_exact))]
+            if semantic_cache:
+                slot = self._q_count % QUERY_CACHE_SIZE
+                self._q_embs[slot] = query_embeddings[row]
+                self._q_results[slot] = (k, results)
+                self._q_count += 1
         
-        return results
+        return all_results
+    
+    def _reset_query_cache(self):
+        """Drop cached query results (the index they came from changed)"""
+        self._q_exact = {}  # query text -> (k, results), oldest first
+        self._q_embs = np.zeros((QUERY_CACHE_SIZE, self.dimension), dtype=np.float32)
+        self._q_results = [None] * QUERY_CACHE_SIZE
+        self._q_count = 0
+    
+    @staticmethod
+    def _skill_query(skill: str) -> str:
+        return f"Job requirements and skills for {skill} developer positions"
     
     def query_by_skill(self, skill: str, top_k: int = 10) -> List[Dict]:
         """
         Get job descriptions specifically for a skill
         """
-        query = f"Job requirements and skills for {skill} developer positions"
-        return self.query(query, top_k)
+        return self.query_many([self._skill_query(skill)], top_k, semantic_cache=False)[0]
     
     def find_related_skills(self, skill: str, top_k: int = 10) -> Dict:
         """
         Find skills commonly mentioned with the given skill
         """
-        results = self.query_by_skill(skill, top_k)
-        
-        # Extract all text and analyze
-        all_text = " ".join([r["text"] for r in results])
-        
-        # Common tech skills
-        tech_skills = [
-            "python", "java", "javascript", "typescript", "go", "rust",
-            "react", "angular", "vue", "node.js", "django", "flask", "fastapi",
-            "aws", "azure", "gcp", "docker", "kubernetes", "terraform",
-            "mongodb", "postgresql", "mysql", "redis",
-            "machine learning", "llm", "rag", "pytorch", "tensorflow"
-        ]
-        
-        # Count occurrences
-        skill_counts = {}
-        text_lower = all_text.lower()
+        return self._related_skills_from_results(skill, self.query_by_skill(skill, top_k))
+    
+    def _related_skills_from_results(self, skill: str, results: List[Dict]) -> Dict:
+        """Count tech skills mentioned in already retrieved results"""
+        # Count occurrences, scanning the first SKILL_SCAN_LIMIT chars of
+        # each hit's pre-lowercased chunk
+        counts = Counter()
+        for r in results:
+            text_lower = self.chunks_lower[r["chunk_id"]][:SKILL_SCAN_LIMIT]
+            counts.update(found for _, found in _SKILL_AUTOMATON.iter(text_lower))
+        counts.pop(skill.lower(), None)  # Exclude the query skill
         
-        for tech_skill in tech_skills:
-            if tech_skill.lower() != skill.lower():  # Exclude the query skill
-                count = text_lower.count(tech_skill)
-                if count > 0:
-                    skill_counts[tech_skill] = count
+        # TECH_SKILLS order, so equal counts rank as before
+        skill_counts = {s: counts[s] for s in TECH_SKILLS if counts[s] > 0}
         
         # Sort by frequency
         sorted_skills = sorted(skill_counts.items(), 
@@ -153,14 +411,16 @@ class MarketRAGStore:
         """
         context = {}
         
-        for skill in skills:
+        # Every skill's query in one batch; the same top-5 hits feed both the
+        # sample jobs and the related-skill counts
+        all_results = self.query_many([self._skill_query(skill) for skill in skills], top_k=5,
+                                      semantic_cache=False)
+        
+        for skill, results in zip(skills, all_results):
             print(f"📊 Analyzing context for: {skill}")
             
-            # Get top job descriptions
-            results = self.query_by_skill(skill, top_k=5)
-            
             # Get related skills
-            related = self.find_related_skills(skill, top_k=5)
+            related = self._related_skills_from_results(skill, results)
             
             context[skill] = {
                 "sample_jobs": [
@@ -185,12 +445,16 @@ class MarketRAGStore:
         # Save FAISS index
         faiss.write_index(self.index, f"{filepath}.faiss")
         
-        # Save metadata
-        with open(f"{filepath}_metadata.pkl", "wb") as f:
-            pickle.dump({
-                "chunks": self.chunks,
-                "metadata": self.metadata
-            }, f)
+        # Save chunks + metadata columns, no pickle: texts as one UTF-8
+        # buffer plus row offsets, metadata as plain NumPy columns
+        encoded = [t.encode("utf-8") for t in self.chunks]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        np.savez(f"{filepath}_metadata.npz",
+                 text_offsets=offsets,
+                 text_bytes=np.frombuffer(b"".join(encoded), dtype=np.uint8),
+                 **dict(self._saved_column(k, v) for k, v in self.metadata.items()),
+                 **{f"state_{k}": v for k, v in self.metadata_state.items()})
         
         print(f"💾 Index saved to {filepath}")
     
@@ -198,13 +462,32 @@ class MarketRAGStore:
         """Load FAISS index and metadata from disk"""
         try:
             # Load FAISS index
-            self.index = faiss.read_index(f"{filepath}.faiss")
+            self.index = read_index_mmap(f"{filepath}.faiss")
             
-            # Load metadata
-            with open(f"{filepath}_metadata.pkl", "rb") as f:
-                data = pickle.load(f)
+            # Load chunks + metadata columns
+            npz_path = Path(f"{filepath}_metadata.npz")
+            if npz_path.exists():
+                with np.load(npz_path, allow_pickle=False) as data:
+                    buf = data["text_bytes"].tobytes()
+                    offsets = data["text_offsets"].tolist()
+                    self.chunks = [buf[a:b].decode("utf-8") for a, b in zip(offsets, offsets[1:])]
+                    self.metadata = {}
+                    for k in data.files:
+                        if k.startswith("meta_"):
+                            self.metadata[k[len("meta_"):]] = data[k]
+                        elif k.startswith("json_"):
+                            self.metadata[k[len("json_"):]] = self._object_column(
+                                [json.loads(x) for x in data[k].tolist()]
+                            )
+                    self.metadata_state = {k[len("state_"):]: data[k] for k in data.files if k.startswith("state_")}
+            else:
+                # Stores saved before the columnar format
+                with open(f"{filepath}_metadata.pkl", "rb") as f:
+                    data = pickle.load(f)
                 self.chunks = data["chunks"]
-                self.metadata = data["metadata"]
+                self.metadata, self.metadata_state = self._metadata_columns(data["metadata"])
+            self.chunks_lower = [t.lower() for t in self.chunks]
+            self._reset_query_cache()
             
             print(f"✅ Index loaded from {filepath}")
             print(f"📊 Loaded {self.index.ntotal} vectors")
@@ -213,6 +496,12 @@ class MarketRAGStore:
         except Exception as e:
             print(f"❌ Failed to load index: {e}")
             return False
+    
+    def close(self):
+        """Stop the encode worker processes"""
+        if self._pool is not None:
+            self.model.stop_multi_process_pool(self._pool)
+            self._pool = None
 
 
 # -------------------------
@@ -264,4 +553,5 @@ if __name__ == "__main__":
     for skill in related["related_skills"][:5]:
         print(f"  • {skill['skill']}: {skill['mentions']} mentions")
     
+    rag_store.close()
     print("\n✅ Tests completed!")
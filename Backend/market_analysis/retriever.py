@@ -10,14 +10,12 @@ import numpy as np
 from pathlib import Path
 from typing import List, Dict
 
-from sentence_transformers import SentenceTransformer
+from .indexer import chunks_to_columns, metadata_columns, get_embed_model, read_index_mmap
 
 DATA_DIR = Path(os.getenv("MARKET_DATA_DIR", "./market_analysis/market_data"))
 INDEX_PATH = DATA_DIR / "faiss_index.bin"
 META_PATH = DATA_DIR / "faiss_metadata.pkl"
 
-EMBED_MODEL = os.getenv("EMBED_MODEL", "sentence-transformers/all-mpnet-base-v2")
-
 
 class MarketRetriever:
     def __init__(self,
@@ -30,45 +28,57 @@ class MarketRetriever:
             raise FileNotFoundError(f"Metadata not found at: {metadata_path}")
 
         print("📥 Loading FAISS index...")
-        self.index = faiss.read_index(index_path)
+        self.index = read_index_mmap(index_path)
+
+        # Large builds are IDMap-wrapped HNSW graphs; let ops tune efSearch
+        # without rebuilding (the value saved with the index is the default)
+        if "HNSW_EF_SEARCH" in os.environ and isinstance(self.index, faiss.IndexIDMap):
+            base = faiss.downcast_index(self.index.index)
+            if isinstance(base, faiss.IndexHNSW):
+                base.hnsw.efSearch = int(os.environ["HNSW_EF_SEARCH"])
 
         print("📥 Loading metadata...")
         with open(metadata_path, "rb") as f:
-            self.metadata = pickle.load(f)
+            metadata = pickle.load(f)
+
+        # Older index builds saved {id: chunk_dict}; convert them to columns
+        if "text" not in metadata:
+            metadata = metadata_columns(chunks_to_columns([metadata[i] for i in range(len(metadata))]))
+
+        self.texts = metadata["text"]
+        self.skills = metadata["skill"]
+        self.titles = metadata["title"]
 
-        print(f"📦 Loaded metadata for {len(self.metadata)} items")
+        print(f"📦 Loaded metadata for {len(self.texts)} items")
 
-        self.model = SentenceTransformer(EMBED_MODEL)
+        self.model = get_embed_model()
 
     def query(self, text: str, top_k: int = 5) -> List[Dict]:
         """
         Returns top-k job chunks matching the query.
         """
         # Embed query
-        q_emb = self.model.encode([text], normalize_embeddings=True).astype("float32")
+        q_emb = self.model.encode([text], normalize_embeddings=True).astype("float32", copy=False)
 
         # Search
         scores, ids = self.index.search(q_emb, top_k)
 
-        results = []
-        for score, idx in zip(scores[0], ids[0]):
-            if idx == -1:
-                continue
-
-            meta = self.metadata[idx]
-
-            results.append({
-                "chunk_id": int(idx),
-                "score": float(score),
-                "chunk_text": meta["cleaned_chunk"],
-                "skill": meta.get("skill"),
-                "source_job_title": meta.get("job_title"),
-                "source_company": meta.get("company"),
-                "source_snippet": meta.get("original_snippet"),
-                "full_job_description": meta.get("full_description")
-            })
-
-        return results
+        # tolist() once gives plain ints/floats for every hit
+        return [
+            {
+                "chunk_id": idx,
+                "score": score,
+                "chunk_text": self.texts[idx],
+                "skill": self.skills[idx],
+                "source_job_title": self.titles[idx],
+                # Chunks carry no company/snippet/full description
+                "source_company": None,
+                "source_snippet": None,
+                "full_job_description": None
+            }
+            for score, idx in zip(scores[0].tolist(), ids[0].tolist())
+            if idx != -1
+        ]
 
 
 # CLI for quick testing
@@ -176,12 +176,35 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional
+import asyncio
 import json
 import re
+import orjson
+import ahocorasick
 from .market_analyzer import run_full_pipeline, query_and_report
 
 router = APIRouter()
 
+# Compiled once; used on every LLM response
+_JSON_FENCE_RE = re.compile(r'^```json\s*', re.MULTILINE)
+_FENCE_RE = re.compile(r'^```\s*$', re.MULTILINE)
+# e.g. "$40.00 - $45.00" or "$80,000 - $120,000"
+_SALARY_RE = re.compile(r'\$[\d,]+(?:\.\d{2})?\s*-\s*\$[\d,]+(?:\.\d{2})?')
+
+# Skills recognised in a quick-analyze query
+SKILL_KEYWORDS = (
+    "python", "javascript", "java", "react", "angular", "vue",
+    "node", "django", "flask", "aws", "azure", "docker",
+    "kubernetes", "sql", "mongodb", "machine learning", "ai",
+    "data science", "devops", "backend", "frontend", "full stack"
+)
+
+# One scan per query; values carry list position to keep SKILL_KEYWORDS order
+_SKILL_AC = ahocorasick.Automaton()
+for _pos, _kw in enumerate(SKILL_KEYWORDS):
+    _SKILL_AC.add_word(_kw, (_pos, _kw))
+_SKILL_AC.make_automaton()
+
 
 class MarketAnalysisRequest(BaseModel):
     query: str = Field(..., description="Market analysis query")
@@ -211,17 +234,24 @@ def parse_llm_json_response(report_data: Dict) -> Dict:
                 print("⚠️ No text found in report data")
                 return report_data
             
-            # Remove markdown code fence if present
-            text = re.sub(r'^```json\s*', '', text, flags=re.MULTILINE)
-            text = re.sub(r'^```\s*$', '', text, flags=re.MULTILINE)
-            text = text.strip()
-            
-            # Remove "json" prefix if present
-            if text.startswith('json'):
-                text = text[4:].strip()
+            # The JSON object sits between the first "{" and the last "}";
+            # markdown fences / a "json" prefix can only be outside it
+            start = text.find('{')
+            end = text.rfind('}')
+            if start != -1 and end > start:
+                text = text[start:end + 1]
+            else:
+                # Remove markdown code fence if present
+                text = _JSON_FENCE_RE.sub('', text)
+                text = _FENCE_RE.sub('', text)
+                text = text.strip()
+                
+                # Remove "json" prefix if present
+                if text.startswith('json'):
+                    text = text[4:].strip()
             
-            # Parse JSON
-            parsed = json.loads(text)
+            # Parse JSON (orjson.JSONDecodeError subclasses json.JSONDecodeError)
+            parsed = orjson.loads(text)
             print("✅ Successfully parsed LLM JSON response")
             return parsed
             
@@ -276,12 +306,9 @@ def normalize_salary_insights(salary_data: Any) -> Dict[str, str]:
             return {}
         
         # Try to extract salary range if present
-        # Look for patterns like "$40.00 - $45.00" or "$80,000 - $120,000"
-        import re
-        salary_pattern = r'\$[\d,]+(?:\.\d{2})?\s*-\s*\$[\d,]+(?:\.\d{2})?'
-        matches = re.findall(salary_pattern, salary_data)
-        if matches:
-            return {"range": matches[0]}
+        match = _SALARY_RE.search(salary_data)
+        if match:
+            return {"range": match.group(0)}
         
         # If there's actual content but no pattern, return as-is
         if len(salary_data.strip()) > 10:
@@ -299,15 +326,10 @@ async def quick_market_analysis(request: MarketAnalysisRequest):
     try:
         # Extract skills from query intelligently
         query_lower = request.query.lower()
-        skill_keywords = [
-            "python", "javascript", "java", "react", "angular", "vue",
-            "node", "django", "flask", "aws", "azure", "docker",
-            "kubernetes", "sql", "mongodb", "machine learning", "ai",
-            "data science", "devops", "backend", "frontend", "full stack"
-        ]
 
         # Detect skills from query
-        skills = [skill for skill in skill_keywords if skill in query_lower]
+        found = {value for _, value in _SKILL_AC.iter(query_lower)}
+        skills = [skill for _, skill in sorted(found)]
         if not skills:
             skills = ["Python", "JavaScript", "React", "Data Science", "DevOps"]
         else:
@@ -315,8 +337,9 @@ async def quick_market_analysis(request: MarketAnalysisRequest):
 
         print(f"🚀 Running full pipeline for skills: {skills} at location: {request.location}")
 
-        # Step 1: Run full pipeline (scrape + index)
-        artifact_info = run_full_pipeline(
+        # Step 1: Run full pipeline (scrape + index), off the event loop
+        artifact_info = await asyncio.to_thread(
+            run_full_pipeline,
             skills=skills,
             location=request.location,
             max_results=20,  # Increased from 10 to match CLI
@@ -324,7 +347,7 @@ async def quick_market_analysis(request: MarketAnalysisRequest):
         )
 
         # Step 2: Run query + LLM report
-        result = query_and_report(
+        result = await query_and_report(
             query=request.query,
             top_k=request.top_k,
             use_llm=request.use_llm,
@@ -3,14 +3,22 @@ SerpAPI Integration for Job Market Data Collection (clean, import-safe)
 - Loads env from .env (optional)
 - Uses SERPAPI_KEY from environment
 - Uses jobs_results length as fallback when total_results is missing/zero
+- Scrapes multiple skills concurrently (bounded) over one async HTTP/2 client
 - No test/main block so it's safe to import
 """
 
 import os
 import time
+import random
+import asyncio
 import requests
-from typing import List, Dict
+import httpx
+import orjson
+import ahocorasick
+from typing import List, Dict, FrozenSet
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Load .env if present
 load_dotenv()
@@ -22,12 +30,91 @@ if not SERPAPI_KEY:
 
 SERPAPI_BASE_URL = "https://serpapi.com/search"
 
+# SerpAPI requests in flight at once when scraping several skills
+SERPAPI_MAX_CONCURRENT = int(os.getenv("SERPAPI_MAX_CONCURRENT", "4"))
+
+# Rate-limit / transient server responses get retried with exponential
+# backoff + jitter (or the server's Retry-After), capped per wait
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+SERPAPI_MAX_RETRIES = 3
+BACKOFF_CAP = 30.0
+
+# Skills pulled out of job descriptions (plain substring matches)
+SKILL_KEYWORDS: FrozenSet[str] = frozenset({
+    "python", "java", "javascript", "typescript", "c++", "c#", "go", "rust",
+    "react", "angular", "vue", "node.js", "express", "django", "flask", "fastapi",
+    "aws", "azure", "gcp", "docker", "kubernetes", "terraform",
+    "mongodb", "postgresql", "mysql", "redis", "elasticsearch",
+    "git", "jenkins", "ci/cd", "agile", "scrum",
+    "machine learning", "deep learning", "llm", "rag", "langchain",
+    "pytorch", "tensorflow", "scikit-learn", "pandas", "numpy"
+})
+
+# Finds every keyword in one pass over the text
+_SKILL_AUTOMATON = ahocorasick.Automaton()
+for _kw in SKILL_KEYWORDS:
+    _SKILL_AUTOMATON.add_word(_kw, _kw)
+_SKILL_AUTOMATON.make_automaton()
+
 
 class JobScraper:
     def __init__(self, api_key: str = None, rate_limit_delay: float = 1.0):
         self.api_key = api_key or SERPAPI_KEY
+        # Base of the backoff after a 429/5xx; successful requests never wait
         self.rate_limit_delay = float(rate_limit_delay)
 
+        # One keep-alive session for every SerpAPI call (no TLS handshake per
+        # skill); adapter retries cover connection errors, statuses are
+        # handled by the backoff loop in scrape_skill_jobs
+        self.session = requests.Session()
+        retry = Retry(total=3, backoff_factor=0.5, status_forcelist=(), allowed_methods=["GET"])
+        self.session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16,
+                                                   max_retries=retry))
+
+    def close(self):
+        """Close the pooled HTTP connections"""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _build_request(self, skill: str, location: str, max_results: int):
+        """SerpAPI query string + request params for one skill"""
+        query = f"{skill} developer"
+        params = {
+            "engine": "google_jobs",
+            "q": query,
+            "location": location,
+            "api_key": self.api_key,
+            "num": max_results
+        }
+        return query, params
+
+    def _backoff_delay(self, attempt: int, headers) -> float:
+        """Seconds to wait before retry number attempt + 1"""
+        base = self.rate_limit_delay
+        delay = min(BACKOFF_CAP, base * 2 ** attempt) + random.uniform(0, base)
+        try:
+            # Server-provided wait wins when it's given in seconds
+            return min(BACKOFF_CAP, float(headers.get("Retry-After", delay)))
+        except ValueError:  # HTTP-date form
+            return delay
+
+    @staticmethod
+    def _error_result(skill: str, query: str, e: Exception) -> Dict:
+        print(f"❌ Error scraping {skill}: {e}")
+        return {
+            "skill": skill,
+            "total_jobs": 0,
+            "job_descriptions": [],
+            "related_skills": [],
+            "search_query": query,
+            "error": str(e)
+        }
+
     def scrape_skill_jobs(self, skill: str, location: str = "United States",
                           max_results: int = 10) -> Dict:
         """
@@ -37,38 +124,53 @@ class JobScraper:
         {
             "skill": skill,
             "total_jobs": int,
-            "job_descriptions": [ {title, company, description, full_text} ],
+            "job_descriptions": [ {title, company, description, full_text, job_id, url} ],
             "related_skills": [...],
             "search_query": query
         }
         """
         print(f"🔍 Scraping jobs for: {skill} (location: {location}, max: {max_results})")
-
-        query = f"{skill} developer"
-
-        params = {
-            "engine": "google_jobs",
-            "q": query,
-            "location": location,
-            "api_key": self.api_key,
-            "num": max_results
-        }
+        query, params = self._build_request(skill, location, max_results)
 
         try:
-            resp = requests.get(SERPAPI_BASE_URL, params=params, timeout=12)
+            for attempt in range(SERPAPI_MAX_RETRIES + 1):
+                resp = self.session.get(SERPAPI_BASE_URL, params=params, timeout=12)
+                if resp.status_code not in RETRY_STATUSES or attempt == SERPAPI_MAX_RETRIES:
+                    break
+                delay = self._backoff_delay(attempt, resp.headers)
+                print(f"⏳ SerpAPI returned {resp.status_code} for {skill}, retrying in {delay:.1f}s...")
+                time.sleep(delay)
             resp.raise_for_status()
             data = resp.json()
         except requests.RequestException as e:
-            print(f"❌ Error scraping {skill}: {e}")
-            return {
-                "skill": skill,
-                "total_jobs": 0,
-                "job_descriptions": [],
-                "related_skills": [],
-                "search_query": query,
-                "error": str(e)
-            }
+            return self._error_result(skill, query, e)
+
+        return self._parse_results(skill, query, data)
+
+    async def scrape_skill_jobs_async(self, client: httpx.AsyncClient, skill: str,
+                                      location: str = "United States",
+                                      max_results: int = 10) -> Dict:
+        """scrape_skill_jobs over a shared AsyncClient (same return shape)"""
+        print(f"🔍 Scraping jobs for: {skill} (location: {location}, max: {max_results})")
+        query, params = self._build_request(skill, location, max_results)
+
+        try:
+            for attempt in range(SERPAPI_MAX_RETRIES + 1):
+                resp = await client.get(SERPAPI_BASE_URL, params=params)
+                if resp.status_code not in RETRY_STATUSES or attempt == SERPAPI_MAX_RETRIES:
+                    break
+                delay = self._backoff_delay(attempt, resp.headers)
+                print(f"⏳ SerpAPI returned {resp.status_code} for {skill}, retrying in {delay:.1f}s...")
+                await asyncio.sleep(delay)
+            resp.raise_for_status()
+            data = orjson.loads(resp.content)
+        except (httpx.HTTPError, orjson.JSONDecodeError) as e:
+            return self._error_result(skill, query, e)
+
+        return self._parse_results(skill, query, data)
 
+    def _parse_results(self, skill: str, query: str, data: Dict) -> Dict:
+        """SerpAPI google_jobs response -> scrape result dict"""
         # Best-effort extraction
         total_results = data.get("search_information", {}).get("total_results", 0)
         jobs = data.get("jobs_results", []) or []
@@ -85,12 +187,16 @@ class JobScraper:
             company = (job.get("company_name") or job.get("company") or "").strip()
             description = (job.get("description") or job.get("snippet") or "").strip()
             full_text = f"{title}. {description}" if title or description else ""
+            apply_options = job.get("apply_options") or []
+            url = job.get("share_link") or (apply_options[0].get("link") if apply_options else None)
 
             job_descriptions.append({
                 "title": title,
                 "company": company,
                 "description": description,
-                "full_text": full_text
+                "full_text": full_text,
+                "job_id": job.get("job_id"),
+                "url": url
             })
 
             # Extract simple keywords (lowercased)
@@ -106,28 +212,31 @@ class JobScraper:
             "search_query": query
         }
 
+    async def scrape_multiple_skills_async(self, skills: List[str], location: str = "United States",
+                                           max_results: int = 10,
+                                           max_concurrent: int = SERPAPI_MAX_CONCURRENT) -> List[Dict]:
+        """
+        Scrape all skills concurrently, at most max_concurrent requests in flight
+        Results come back in the same order as skills
+        """
+        sem = asyncio.Semaphore(max_concurrent)
+        async with httpx.AsyncClient(http2=True, timeout=12.0,
+                                     limits=httpx.Limits(max_connections=max_concurrent)) as client:
+            async def bounded(skill: str) -> Dict:
+                async with sem:
+                    return await self.scrape_skill_jobs_async(client, skill, location, max_results)
+
+            return list(await asyncio.gather(*(bounded(skill) for skill in skills)))
+
     def scrape_multiple_skills(self, skills: List[str], location: str = "United States",
                                max_results: int = 10) -> List[Dict]:
-        results = []
-        for i, skill in enumerate(skills):
-            results.append(self.scrape_skill_jobs(skill, location=location, max_results=max_results))
-            if i < len(skills) - 1:
-                print(f"⏳ Waiting {self.rate_limit_delay}s before next request...")
-                time.sleep(self.rate_limit_delay)
-        return results
+        """Sync wrapper around scrape_multiple_skills_async (call from outside an event loop)"""
+        return asyncio.run(self.scrape_multiple_skills_async(skills, location=location,
+                                                             max_results=max_results))
 
     def _extract_skills_from_text(self, text: str) -> List[str]:
         if not text:
             return []
-        text_lower = text.lower()
-        skill_keywords = {
-            "python", "java", "javascript", "typescript", "c++", "c#", "go", "rust",
-            "react", "angular", "vue", "node.js", "express", "django", "flask", "fastapi",
-            "aws", "azure", "gcp", "docker", "kubernetes", "terraform",
-            "mongodb", "postgresql", "mysql", "redis", "elasticsearch",
-            "git", "jenkins", "ci/cd", "agile", "scrum",
-            "machine learning", "deep learning", "llm", "rag", "langchain",
-            "pytorch", "tensorflow", "scikit-learn", "pandas", "numpy"
-        }
-        found = [kw for kw in skill_keywords if kw in text_lower]
-        return found
+        # The automaton is case-sensitive, so this single lower() is the only
+        # per-call copy; one C-level scan finds every keyword
+        return list({kw for _, kw in _SKILL_AUTOMATON.iter(text.lower())})
@@ -1,35 +1,100 @@
 """
-ThreadPool executor for handling heavy ML operations
+Worker threads/processes for handling heavy ML operations
 Prevents blocking FastAPI event loop
 """
 import logging
-from concurrent.futures import ThreadPoolExecutor
+import os
 import asyncio
+import functools
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import anyio
 
 logger = logging.getLogger(__name__)
 
-# Create a thread pool for ML operations
-# Adjust max_workers based on your server capacity (typically CPU cores)
-ML_EXECUTOR = ThreadPoolExecutor(
-    max_workers=4,  # Adjust based on CPU cores and memory
-    thread_name_prefix="ml_worker"
+# ML calls run on anyio's worker threads (the pool FastAPI/Starlette already
+# use), with their own limit: one call per core, capped at 8. Their BERT
+# encodes all queue on the single ENCODER worker, which uses every core
+# itself; the calls overlap the rest (parsing, TF-IDF, FAISS, scraping)
+ML_CONCURRENCY = min(8, os.cpu_count() or 1)
+_ml_limiter = None
+
+# Opt-in: run ML calls in this many worker processes instead, so CPU-bound
+# scoring escapes the GIL. Each worker loads its own models and caches, so
+# this trades memory for cores (0 = threads only)
+ML_PROCESS_WORKERS = int(os.getenv("ML_PROCESS_WORKERS", "0"))
+_ml_pool = None
+
+# Secondary pool for the independent stages inside a single analysis
+# (BERT, TF-IDF, company scraping). Kept separate from the ML threads so a
+# request waiting on its stages can never starve the pool it runs in.
+STAGE_EXECUTOR = ThreadPoolExecutor(
+    max_workers=8,
+    thread_name_prefix="stage_worker"
+)
+
+# Process pool for CPU-bound PDF parsing, so many resumes parse on all cores.
+# "spawn" keeps children clean of the parent's torch/model state; workers
+# only import pdf_parser, which has no ML dependencies.
+PDF_POOL = ProcessPoolExecutor(
+    max_workers=int(os.getenv("PDF_WORKERS", os.cpu_count() or 1)),
+    mp_context=multiprocessing.get_context("spawn")
 )
 
-def execute_ml_work(func, *args, **kwargs):
+def _get_ml_limiter() -> anyio.CapacityLimiter:
+    """Created on first use, inside the running event loop"""
+    global _ml_limiter
+    if _ml_limiter is None:
+        _ml_limiter = anyio.CapacityLimiter(ML_CONCURRENCY)
+    return _ml_limiter
+
+def _ml_worker_init():
+    """Load and warm the models once per worker process, not once per task"""
+    # Split the cores between the worker processes' torch, OpenMP (FAISS)
+    # and BLAS thread pools; set before calculation loads those runtimes
+    share = str(max(1, (os.cpu_count() or 1) // ML_PROCESS_WORKERS))
+    for var in ("TORCH_THREADS", "OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ.setdefault(var, share)
+    from calculation import warm_up_models  # loads BERT + the encoder service at import
+    warm_up_models()
+
+def _get_ml_pool() -> ProcessPoolExecutor:
+    global _ml_pool
+    if _ml_pool is None:
+        # forkserver: children start from a clean server process instead of
+        # forking the parent's torch threads; spawn where it's unavailable
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        logger.info("Starting %s ML worker processes (%s)", ML_PROCESS_WORKERS, method)
+        _ml_pool = ProcessPoolExecutor(
+            max_workers=ML_PROCESS_WORKERS,
+            mp_context=multiprocessing.get_context(method),
+            initializer=_ml_worker_init
+        )
+    return _ml_pool
+
+async def execute_ml_work(func, *args, **kwargs):
     """
-    Execute ML work in thread pool
-    Returns a coroutine that can be awaited
+    Execute ML work in a worker thread, at most ML_CONCURRENCY at a time
+    (or in the ML process pool when ML_PROCESS_WORKERS is set; func must then
+    be a module-level function and its arguments picklable, so pass URLs/text
+    rather than file bytes)
     
     Usage:
         result = await execute_ml_work(heavy_ml_function, arg1, arg2, kwarg1=value1)
     """
-    loop = asyncio.get_event_loop()
-    return loop.run_in_executor(ML_EXECUTOR, lambda: func(*args, **kwargs))
+    call = functools.partial(func, *args, **kwargs)
+    if ML_PROCESS_WORKERS > 0:
+        return await asyncio.get_running_loop().run_in_executor(_get_ml_pool(), call)
+    return await anyio.to_thread.run_sync(call, limiter=_get_ml_limiter())
 
 def shutdown_executor():
-    """Gracefully shutdown thread pool executor"""
-    logger.info("Shutting down ML ThreadPoolExecutor...")
-    ML_EXECUTOR.shutdown(wait=True)
-    logger.info("ML ThreadPoolExecutor shutdown complete")
+    """Gracefully shutdown the stage thread pool and the process pools"""
+    logger.info("Shutting down ML executors...")
+    if _ml_pool is not None:
+        _ml_pool.shutdown(wait=True)
+    STAGE_EXECUTOR.shutdown(wait=True)
+    PDF_POOL.shutdown(wait=True)
+    logger.info("ML executors shutdown complete")
 
 
@@ -0,0 +1,52 @@
+"""
+Async PDF downloads for batch endpoints
+One shared HTTP/2 client so N resume fetches overlap instead of queueing
+"""
+import logging
+import asyncio
+import httpx
+
+logger = logging.getLogger(__name__)
+
+_client = None
+
+def get_http_client():
+    """Lazily create the shared AsyncClient (must be called inside the event loop)"""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            http2=True,
+            timeout=15,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=16)
+        )
+    return _client
+
+async def _fetch_one(client, url):
+    try:
+        response = await client.get(url)
+        if response.status_code != 200:
+            raise Exception(f"HTTP {response.status_code}")
+        return url, response.content
+    except Exception as e:
+        logger.error("⚠️ PDF download failed for %s: %s", url, e)
+        return url, None
+
+async def fetch_pdfs(urls):
+    """
+    Download all URLs concurrently.
+    Returns {url: bytes} for successful downloads only.
+    """
+    if not urls:
+        return {}
+    client = get_http_client()
+    results = await asyncio.gather(*(_fetch_one(client, url) for url in urls))
+    return {url: content for url, content in results if content is not None}
+
+async def close_http_client():
+    """Close the shared client on application shutdown"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        logger.info("✅ PDF HTTP client closed")
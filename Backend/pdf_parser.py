@@ -0,0 +1,16 @@
+"""
+PDF -> text parsing with no ML imports
+Safe to load in worker processes without pulling in torch or the models
+"""
+import fitz  # PyMuPDF
+
+# Resumes are 1-2 pages; anything past this is appendix material
+MAX_PDF_PAGES = 5
+
+def extract_text_from_bytes(data, max_pages=MAX_PDF_PAGES):
+    # Parse straight from bytes; sort=False skips the reading-order pass,
+    # which bag-of-words scoring downstream doesn't need
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        return "\n".join(
+            doc[i].get_text("text", sort=False) for i in range(min(max_pages, doc.page_count))
+        )
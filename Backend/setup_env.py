@@ -40,14 +40,10 @@ PORT=8000
 def check_dependencies():
     """Check if required dependencies are installed"""
     try:
-        import spacy
-        try:
-            spacy.load("en_core_web_sm")
-            print("✅ spaCy model is installed")
-        except OSError:
-            print("⚠️ spaCy model not found. Please run: python -m spacy download en_core_web_sm")
+        import ahocorasick
+        print("✅ pyahocorasick is installed")
     except ImportError:
-        print("❌ spaCy not installed. Please run: pip install spacy")
+        print("❌ pyahocorasick not installed. Please run: pip install pyahocorasick")
     
     try:
         import sklearn
@@ -77,5 +73,4 @@ if __name__ == "__main__":
     print("\n✅ Setup complete!")
     print("📋 Next steps:")
     print("1. Update .env file with your MongoDB URI")
-    print("2. Install spaCy model: python -m spacy download en_core_web_sm")
-    print("3. Start the server: uvicorn main:app --reload") 
\ No newline at end of file
+    print("2. Start the server: uvicorn main:app --reload") 
\ No newline at end of file
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Test script to verify job description cleaning in the market pipeline
+The visible text kept from HTML is what BeautifulSoup's get_text() returned
+"""
+
+from market_analysis.data_processor import JobDataProcessor
+
+# (raw scraped description, cleaned text)
+CLEAN_CASES = [
+    ("Python developer for R&D, 3+ years", "Python developer for RD, 3 years"),
+    ("<p>Build <b>REST</b> APIs</p>\n<p>Deploy on AWS</p>", "Build REST APIs Deploy on AWS"),
+    ("<p>Salary &amp; benefits</p>", "Salary benefits"),
+    # Script/style bodies are not visible text
+    ("<div><script>var x=1</script>Real text</div>", "Real text"),
+    ("<style>p { color: red }</style><p>Remote friendly</p>", "Remote friendly"),
+    # Text after the closing document tags is kept
+    ("<html><body><p>Apply now</p></body></html> Equal opportunity employer",
+     "Apply now Equal opportunity employer"),
+    # lxml refuses str input with an encoding declaration: regex fallback
+    ('<?xml version="1.0" encoding="utf-8"?><div>Senior <i>Go</i> engineer</div>',
+     "Senior Go engineer"),
+    ('<?xml version="1.0" encoding="utf-8"?><script>track()</script><p>Hybrid role</p>',
+     "Hybrid role"),
+    ("See https://example.com/jobs or www.example.com", "See or"),
+    ("   <br>  ", ""),
+]
+
+def test_clean_text():
+    """HTML is reduced to its visible text, then punctuation/URLs/whitespace are normalized"""
+    processor = JobDataProcessor()
+    for raw, expected in CLEAN_CASES:
+        cleaned = processor.clean_text(raw)
+        print(f"🧹 {raw!r}: {cleaned!r}")
+        assert cleaned == expected, f"{raw!r}: {cleaned!r} != {expected!r}"
+
+if __name__ == "__main__":
+    print("🧪 Testing job description cleaning")
+    print("=" * 40)
+    test_clean_text()
+    print("\n✅ Job description cleaning test complete!")
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Test script to verify resume skill and field extraction
+Expected values are what the original spaCy token / PhraseMatcher
+matching and per-field regexes returned
+"""
+
+from calculation import extract_skills, extract_fields
+
+# (case-folded resume text, skills it must yield)
+SKILL_CASES = [
+    ("python, java and sql", {"python", "java", "sql"}),
+    # Keywords inside longer words never fire
+    ("javascript and typescript", {"javascript", "typescript"}),
+    ("mysql and postgresql", {"mysql"}),
+    ("github actions, dockerized builds", set()),
+    ("reactive streams in vuex", set()),
+    # Punctuation inside a keyword is part of it; around it, a boundary
+    ("node.js, next.js and c++", {"node.js", "next.js", "c++"}),
+    ("flask-based apis on aws.", {"flask", "aws"}),
+    ("", set()),
+]
+
+# (case-folded resume text, fields it must yield); degree/branch are
+# left out when absent, cgpa/experience are always present
+FIELD_CASES = [
+    ("btech in computer science with cgpa: 8.7 and 3+ years of experience",
+     {"cgpa": 8.7, "experience": 3, "degree": "btech", "branch": "computer science"}),
+    ("gpa 3.9, 10 yrs experience", {"cgpa": 3.9, "experience": 10}),
+    ("master in information technology", {"cgpa": None, "experience": None,
+                                          "degree": "master", "branch": "information technology"}),
+    # The first occurrence of each field wins
+    ("phd, then master; electronics and electrical; cgpa 9.1, gpa 3.2",
+     {"cgpa": 9.1, "experience": None, "degree": "phd", "branch": "electronics"}),
+    ("2 years of experience, 5 years experience", {"cgpa": None, "experience": 2}),
+    # Degree/branch words inside longer words never fire; cgpa needs a decimal
+    ("mastered civilian mechanics, cgpa 9", {"cgpa": None, "experience": None}),
+    ("", {"cgpa": None, "experience": None}),
+]
+
+def test_extract_skills():
+    """Keywords match on word boundaries only"""
+    for text, expected in SKILL_CASES:
+        found = extract_skills(text)
+        print(f"🔍 {text!r}: {sorted(found)}")
+        assert found == expected, f"{text!r}: {sorted(found)} != {sorted(expected)}"
+    assert isinstance(extract_skills("python"), frozenset)
+
+def test_extract_fields():
+    """One regex sweep gives the same fields as the separate matchers"""
+    for text, expected in FIELD_CASES:
+        fields = extract_fields(text)
+        print(f"🔍 {text!r}: {fields}")
+        assert fields == expected, f"{text!r}: {fields} != {expected}"
+
+if __name__ == "__main__":
+    print("🧪 Testing resume extraction")
+    print("=" * 40)
+    test_extract_skills()
+    test_extract_fields()
+    print("\n✅ Resume extraction test complete!")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test script to verify job dedupe in the market ingest pipeline
+Key order: job_id, then normalized URL, then title + company + description[:120]
+"""
+
+import os
+
+# ingest refuses to import without a key; dedupe never calls SerpAPI
+os.environ.setdefault("SERPAPI_KEY", "test-key")
+
+from market_analysis.ingest import dedupe_scraped_results, normalize_url
+
+def _job(title="Python Developer", company="Acme", description="Build APIs.", **extra):
+    return {"title": title, "company": company, "description": description, **extra}
+
+def _kept(*jobs):
+    """Titles kept after deduping the jobs as one skill group"""
+    result = dedupe_scraped_results([{"skill": "Python", "job_descriptions": list(jobs)}])
+    return [job["title"] for job in result[0]["job_descriptions"]]
+
+def test_job_id_wins():
+    """Same job_id is one posting, whatever its URL or description says"""
+    assert _kept(
+        _job("A", job_id="123", url="https://jobs.example.com/1", description="Old text"),
+        _job("B", job_id="123", url="https://jobs.example.com/2", description="Edited text"),
+    ) == ["A"]
+    # Different ids are different postings even with identical text
+    assert _kept(_job("A", job_id="1"), _job("B", job_id="2")) == ["A", "B"]
+    print("✅ job_id dedupe")
+
+def test_url_normalization():
+    """Tracking params, fragments and host case don't make a new posting"""
+    assert normalize_url("HTTPS://Jobs.Example.com/view?id=7&utm_source=x&gclid=y#apply") == \
+        "https://jobs.example.com/view?id=7"
+    assert _kept(
+        _job("A", url="https://jobs.example.com/view?id=7"),
+        _job("B", url="https://JOBS.example.com/view?id=7&utm_campaign=spring&fbclid=z"),
+        _job("C", url="https://jobs.example.com/view?id=7#details"),
+    ) == ["A"]
+    # Other query params still identify the posting; the path keeps its case
+    assert _kept(
+        _job("A", url="https://jobs.example.com/view?id=7"),
+        _job("B", url="https://jobs.example.com/view?id=8"),
+        _job("C", url="https://jobs.example.com/View?id=7"),
+    ) == ["A", "B", "C"]
+    print("✅ URL dedupe")
+
+def test_url_beats_text():
+    """Postings with their own URLs are kept even when the text is identical"""
+    assert _kept(
+        _job("Same", url="https://jobs.example.com/1"),
+        _job("Same", url="https://jobs.example.com/2"),
+    ) == ["Same", "Same"]
+    print("✅ URL before text")
+
+def test_text_fallback():
+    """Without id/URL: title + company + first 120 description chars"""
+    prefix = "x" * 120
+    assert _kept(
+        _job("A", description=prefix + " posted monday"),
+        _job("A", description=prefix + " reposted friday"),
+    ) == ["A"]
+    assert _kept(
+        _job("A", description="y" + prefix),
+        _job("A", description="z" + prefix),
+    ) == ["A", "A"]
+    # Surrounding whitespace is ignored, company is part of the key
+    assert _kept(_job(" A "), _job("A")) == [" A "]
+    assert _kept(_job("A", company="Acme"), _job("A", company="Globex")) == ["A", "A"]
+    print("✅ Text fallback dedupe")
+
+def test_dedupe_across_skills():
+    """A posting found under a second skill is dropped there, counts follow"""
+    result = dedupe_scraped_results([
+        {"skill": "Python", "job_descriptions": [_job("A", job_id="1"), _job("B", job_id="2")]},
+        {"skill": "Django", "job_descriptions": [_job("A again", job_id="1"), _job("C", job_id="3")]},
+    ])
+    assert [[job["title"] for job in r["job_descriptions"]] for r in result] == [["A", "B"], ["C"]]
+    assert [r["total_jobs"] for r in result] == [2, 1]
+    print("✅ Cross-skill dedupe")
+
+if __name__ == "__main__":
+    print("🧪 Testing ingest dedupe")
+    print("=" * 40)
+    test_job_id_wins()
+    test_url_normalization()
+    test_url_beats_text()
+    test_text_fallback()
+    test_dedupe_across_skills()
+    print("\n✅ Ingest dedupe test complete!")
@@ -132,18 +132,95 @@ from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
 from typing import Optional
 from bson import ObjectId
 from datetime import datetime
-from database import resume_collection
+from database import async_resume_collection
 from utils import upload_pdf_to_cloudinary
-from calculation import analyze_resume_against_jd
+from calculation import analyze_resume_against_jd, EMBEDDING_MODEL_TAG
+from bson.binary import Binary
 from ai_feedback import generate_feedback
 from auth_utils import get_current_user
-from ml_executor import execute_ml_work
+from ml_executor import execute_ml_work, PDF_POOL
+from pdf_fetcher import fetch_pdfs
+from pdf_parser import extract_text_from_bytes
+import os
+import asyncio
+import hashlib
 import logging
+import diskcache
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# -------------------------
+# Analysis Cache
+# -------------------------
+# Same resume PDF (by content, so a replaced Drive file is a new key) + JD
+# + company -> the stored analysis, feedback and resume embedding, so re-runs
+# (and every guest request after the first) skip the ML pipeline
+ANALYSIS_CACHE_TTL = 86400
+_ANALYSIS_CACHE = diskcache.Cache(os.getenv("ANALYSIS_CACHE_DIR", "./.analysis_cache"), size_limit=1 << 30)
+
+def _analysis_cache_key(pdf_bytes, jd_text, company_name, company_url):
+    h = hashlib.blake2b(digest_size=16)
+    h.update(pdf_bytes)
+    h.update(b"\0")
+    # The cached analysis carries the resume embedding: a model/precision switch is a new key
+    h.update(f"{jd_text}|{company_name}|{company_url}|{EMBEDDING_MODEL_TAG}".encode())
+    return h.hexdigest()
+
+async def _analyze_with_feedback(resume_url, jd_text, company_name=None, company_url=None):
+    """Analysis dict (with jdText, aiFeedback, resumeEmbedding), from cache when inputs repeat"""
+    # The PDF is fetched here to key the cache on its content; on a miss its
+    # parsed text goes to the analysis, so it isn't downloaded twice
+    cache_key = resume_text = None
+    pdf_bytes = (await fetch_pdfs([resume_url])).get(resume_url)
+    if pdf_bytes is not None:
+        cache_key = _analysis_cache_key(pdf_bytes, jd_text, company_name, company_url)
+        # diskcache is SQLite + file I/O: keep it off the event loop
+        cached = await asyncio.to_thread(_ANALYSIS_CACHE.get, cache_key)
+        if cached is not None:
+            logger.info("✅ Analysis served from cache")
+            return cached
+        try:
+            resume_text = await asyncio.get_running_loop().run_in_executor(
+                PDF_POOL, extract_text_from_bytes, pdf_bytes
+            )
+        except Exception as e:
+            logger.warning("⚠️ PDF parsing failed for %s: %s", resume_url, e)
+
+    # 🚀 Perform RAG-enhanced analysis in ThreadPool (NON-BLOCKING)
+    logger.info("🚀 Starting ML analysis in background thread...")
+    analysis = await execute_ml_work(
+        analyze_resume_against_jd,
+        resume_url=resume_url,
+        jd_text=jd_text,
+        company_name=company_name,
+        company_url=company_url,
+        resume_text=resume_text
+    )
+    logger.info("✅ ML analysis completed")
+    
+    # Add JD text to analysis for feedback generation
+    analysis["jdText"] = jd_text
+    
+    resume_text = analysis.get("resumeText", "")
+
+    # 🤖 Generate AI feedback in ThreadPool (NON-BLOCKING)
+    logger.info("🤖 Generating AI feedback in background thread...")
+    feedback = await execute_ml_work(
+        generate_feedback,
+        resume_text=resume_text,
+        analysis_results=analysis
+    )
+    logger.info("✅ AI feedback generated")
+
+    analysis["aiFeedback"] = feedback
+    # An empty resumeText means the download/parse failed; retry that next time.
+    # The entry keeps resumeEmbedding, so a hit still stores the embedding
+    if cache_key and resume_text:
+        await asyncio.to_thread(_ANALYSIS_CACHE.set, cache_key, analysis, expire=ANALYSIS_CACHE_TTL)
+    return analysis
+
 @router.post("/upload-resume-analyze")
 async def upload_and_analyze_resume(
     file: Optional[UploadFile] = File(None),
@@ -153,11 +230,13 @@ async def upload_and_analyze_resume(
     company_url: Optional[str] = Form(None),   # 🆕 NEW: Company website URL
     user=Depends(get_current_user),
 ):
-    logger.info(f"📩 Received request from user: {user['email']}")
-    logger.info(f"📎 File uploaded: {bool(file)}")
-    logger.info(f"🔗 Drive URL received: {drive_url}")
-    logger.info(f"🏢 Company Name: {company_name}")
-    logger.info(f"🌐 Company URL: {company_url}")
+    logger.info("📩 Received request from user: %s", user['email'])
+    # Per-field request details only when debugging
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("📎 File uploaded: %s", bool(file))
+        logger.debug("🔗 Drive URL received: %s", drive_url)
+        logger.debug("🏢 Company Name: %s", company_name)
+        logger.debug("🌐 Company URL: %s", company_url)
 
     if not file and not drive_url:
         raise HTTPException(status_code=400, detail="Please upload a resume or provide a Google Drive link.")
@@ -169,14 +248,17 @@ async def upload_and_analyze_resume(
             if file.content_type != "application/pdf":
                 raise HTTPException(status_code=400, detail="Only PDF files are supported.")
             logger.info("📤 Uploading to Cloudinary...")
-            resume_url = upload_pdf_to_cloudinary(file.file)
-            logger.info(f"✅ Uploaded to: {resume_url}")
+            # Blocking SDK call: run it in a worker thread so the loop keeps serving
+            resume_url = await asyncio.to_thread(upload_pdf_to_cloudinary, file.file)
+            logger.info("✅ Uploaded to: %s", resume_url)
         else:
             resume_url = drive_url.strip()
-            logger.info(f"✅ Using provided Google Drive link: {resume_url}")
+            logger.info("✅ Using provided Google Drive link: %s", resume_url)
 
-        # Store resume document
+        # Resume document, written once below when scores + feedback are in;
+        # the id is assigned up front
         resume_doc = {
+            "_id": ObjectId(),
             "email": user["email"],
             "resumeUrl": resume_url,
             "driveUrl": drive_url.strip() if drive_url else "NULL",
@@ -192,50 +274,29 @@ async def upload_and_analyze_resume(
             "uploadedAt": datetime.utcnow(),
         }
 
-        result = resume_collection.insert_one(resume_doc)
-        resume_id = str(result.inserted_id)
-
-        # 🚀 Perform RAG-enhanced analysis in ThreadPool (NON-BLOCKING)
-        logger.info("🚀 Starting ML analysis in background thread...")
-        analysis = await execute_ml_work(
-            analyze_resume_against_jd,
-            resume_url=resume_url,
-            jd_text=jd_text,
-            company_name=company_name,
-            company_url=company_url
-        )
-        logger.info("✅ ML analysis completed")
-        
-        # Add JD text to analysis for feedback generation
-        analysis["jdText"] = jd_text
-        
-        resume_text = analysis.get("resumeText", "")
-
-        # 🤖 Generate AI feedback in ThreadPool (NON-BLOCKING)
-        logger.info("🤖 Generating AI feedback in background thread...")
-        feedback = await execute_ml_work(
-            generate_feedback,
-            resume_text=resume_text,
-            analysis_results=analysis
-        )
-        logger.info("✅ AI feedback generated")
-
-        analysis["aiFeedback"] = feedback
-
-        # Update document with scores and feedback
-        resume_collection.update_one(
-            {"_id": ObjectId(resume_id)},
-            {
-                "$set": {
-                    "scores.skillScore": analysis["skillScore"],
-                    "scores.tfidfScore": analysis["tfidfScore"],
-                    "scores.bertScore": analysis["bertScore"],
-                    "scores.hybridScore": analysis["hybridScore"],
-                    "aiFeedback": feedback,
-                    "ragData": analysis.get("ragData", {}),  # 🆕 Store RAG data
-                }
-            },
-        )
+        resume_id = str(resume_doc["_id"])
+
+        analysis = await _analyze_with_feedback(resume_url, jd_text, company_name, company_url)
+        feedback = analysis["aiFeedback"]
+        # Raw bytes: stored below, never part of the JSON response
+        embedding = analysis.pop("resumeEmbedding", None)
+
+        resume_doc["scores"] = {
+            "skillScore": analysis["skillScore"],
+            "tfidfScore": analysis["tfidfScore"],
+            "bertScore": analysis["bertScore"],
+            "hybridScore": analysis["hybridScore"],
+        }
+        resume_doc["aiFeedback"] = feedback
+        resume_doc["ragData"] = analysis.get("ragData", {})  # 🆕 Store RAG data
+
+        # Persist the resume embedding so /top-matches never re-encodes it
+        if embedding is not None:
+            resume_doc["embedding"] = Binary(embedding)
+            resume_doc["embeddingModel"] = EMBEDDING_MODEL_TAG
+
+        # Single write with the complete document
+        await async_resume_collection.insert_one(resume_doc)
 
         return {
             "message": "Resume uploaded and analyzed successfully",
@@ -248,7 +309,7 @@ async def upload_and_analyze_resume(
         }
 
     except Exception as e:
-        logger.error(f"❌ Error during resume analysis: {str(e)}", exc_info=True)
+        logger.error("❌ Error during resume analysis: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -266,30 +327,12 @@ async def analyze_guest_resume():
         algorithms, and cloud platforms (e.g., AWS) is a plus. Strong problem-solving skills and the ability to work in cross-functional teams are essential.
         """
 
-        # 🚀 Analyze with RAG (no company info for guest) in ThreadPool
-        logger.info("🚀 Starting guest resume analysis in background thread...")
-        analysis = await execute_ml_work(
-            analyze_resume_against_jd,
-            resume_url=resume_url,
-            jd_text=jd_text,
-            company_name=None,
-            company_url=None
-        )
+        # 🚀 Analyze with RAG (no company info for guest); the inputs are
+        # constant, so after the first call this is a cache hit
+        logger.info("🚀 Starting guest resume analysis...")
+        analysis = await _analyze_with_feedback(resume_url, jd_text)
+        analysis.pop("resumeEmbedding", None)
         logger.info("✅ Guest resume analysis completed")
-        
-        analysis["jdText"] = jd_text
-        resume_text = analysis.get("resumeText", "")
-
-        # Generate feedback in ThreadPool
-        logger.info("🤖 Generating guest feedback in background thread...")
-        feedback = await execute_ml_work(
-            generate_feedback,
-            resume_text=resume_text,
-            analysis_results=analysis
-        )
-        logger.info("✅ Guest feedback generated")
-        
-        analysis["aiFeedback"] = feedback
 
         return {
             "message": "Guest resume analyzed successfully",
@@ -298,5 +341,5 @@ async def analyze_guest_resume():
         }
 
     except Exception as e:
-        logger.error(f"❌ Error analyzing guest resume: {str(e)}", exc_info=True)
+        logger.error("❌ Error analyzing guest resume: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error analyzing guest resume: {str(e)}")
\ No newline at end of file
@@ -24,16 +24,27 @@ def generate_token(user_id: str):
     secret_key = os.getenv("JWT_SECRET", "your-secret-key-here-change-in-production")
     return jwt.encode(payload, secret_key, algorithm="HS256")
 
+# Chunk size for Cloudinary's chunked upload API
+UPLOAD_CHUNK_SIZE = 6_000_000
+
 # PDF Upload to Cloudinary (unsigned)
 def upload_pdf_to_cloudinary(file):
     try:
         print("📤 Uploading resume to Cloudinary...")
 
-        result = cloudinary.uploader.unsigned_upload(
+        # The spooled upload may have been read already; send it from the start
+        if hasattr(file, "seek"):
+            file.seek(0)
+
+        # Chunked upload: reads and sends UPLOAD_CHUNK_SIZE at a time instead
+        # of buffering the whole PDF for one request
+        result = cloudinary.uploader.upload_large(
             file,
             upload_preset=UPLOAD_PRESET,
+            unsigned=True,           # Unsigned preset, as before
             resource_type="raw",     # Required for non-image (PDF) uploads
-            public_id=None           # Auto-generate unique name
+            public_id=None,          # Auto-generate unique name
+            chunk_size=UPLOAD_CHUNK_SIZE
         )
 
         print("✅ Uploaded:", result["secure_url"])